@@ -0,0 +1,45 @@
+"""Compare two benchmark result files metric by metric
+
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+import json
+import argparse
+from typing import Any, Dict
+
+
+def flatten(run: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    metrics = {}
+    for key, value in run.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and key != "rows":
+            metrics[prefix + key] = value
+    return metrics
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before, "r", encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, "r", encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']}")
+
+    before_runs = {run["rows"]: flatten(run) for run in before["runs"]}
+    for run in after["runs"]:
+        old = before_runs.get(run["rows"])
+        if old is None:
+            continue
+        print(f"\n{run['rows']} rows")
+        for metric, value in flatten(run).items():
+            if metric in old and old[metric]:
+                change = (value - old[metric]) / old[metric] * 100
+                print(f"  {metric:36s} {old[metric]:12.3f} {value:12.3f} {change:+8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
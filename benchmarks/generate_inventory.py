@@ -0,0 +1,124 @@
+"""Synthetic dealer inventory CSVs with the columns format_car_document expects
+
+    python -m benchmarks.generate_inventory 100000 benchmarks/data/cars_100k.csv
+"""
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+# (Make, Model, MarketClass, EPAClassification, Fuel_Type, PassengerCapacity, engine, displacement, price)
+CATALOG = [
+    ("Toyota", "Camry", "4dr Car", "Midsize Cars", "Gasoline Fuel", 5, "2.5L I-4 gas DOHC", 152, 28000),
+    ("Toyota", "RAV4", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "2.5L I-4 gas DOHC", 152, 31000),
+    ("Toyota", "RAV4 Hybrid", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Hybrid Fuel", 5, "2.5L I-4 hybrid DOHC", 152, 34000),
+    ("Toyota", "Highlander", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 8, "2.4L I-4 turbo DOHC", 146, 42000),
+    ("Toyota", "Prius", "4dr Car", "Midsize Cars", "Hybrid Fuel", 5, "2.0L I-4 hybrid DOHC", 122, 29000),
+    ("Toyota", "Tacoma", "Crew Cab Pickup", "Small Pickup Trucks 4WD", "Gasoline Fuel", 5, "3.5L V-6 gas DOHC", 211, 38000),
+    ("Honda", "Civic", "4dr Car", "Compact Cars", "Gasoline Fuel", 5, "2.0L I-4 gas DOHC", 122, 25000),
+    ("Honda", "CR-V", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "1.5L I-4 turbo DOHC", 91, 32000),
+    ("Honda", "Odyssey", "Mini-van, Passenger", "Minivan 2WD", "Gasoline Fuel", 8, "3.5L V-6 gas SOHC", 212, 41000),
+    ("Honda", "Pilot", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 8, "3.5L V-6 gas DOHC", 212, 43000),
+    ("Ford", "F-150", "Crew Cab Pickup", "Standard Pickup Trucks 4WD", "Gasoline Fuel", 6, "3.5L V-6 turbo DOHC", 213, 52000),
+    ("Ford", "Escape", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "1.5L I-3 turbo DOHC", 91, 30000),
+    ("Ford", "Explorer", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 7, "2.3L I-4 turbo DOHC", 140, 40000),
+    ("Ford", "Mustang Mach-E", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Electric Fuel System", 5, "Electric motor", 0, 45000),
+    ("Ford", "Super Duty F-250", "Crew Cab Pickup", "Standard Pickup Trucks 4WD", "Diesel Fuel", 6, "6.7L V-8 diesel OHV", 406, 68000),
+    ("Chevrolet", "Equinox", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "1.5L I-4 turbo DOHC", 91, 29000),
+    ("Chevrolet", "Tahoe", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 8, "5.3L V-8 gas OHV", 325, 62000),
+    ("Chevrolet", "Bolt EV", "4dr Car", "Small Station Wagons", "Electric Fuel System", 5, "Electric motor", 0, 27000),
+    ("Chevrolet", "Silverado 1500", "Crew Cab Pickup", "Standard Pickup Trucks 4WD", "Gasoline Fuel", 6, "5.3L V-8 gas OHV", 325, 50000),
+    ("Tesla", "Model 3", "4dr Car", "Midsize Cars", "Electric Fuel System", 5, "Electric motor", 0, 41000),
+    ("Tesla", "Model Y", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Electric Fuel System", 7, "Electric motor", 0, 46000),
+    ("Hyundai", "Tucson", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "2.5L I-4 gas DOHC", 152, 29000),
+    ("Hyundai", "Ioniq 5", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Electric Fuel System", 5, "Electric motor", 0, 44000),
+    ("Kia", "Telluride", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 8, "3.8L V-6 gas DOHC", 231, 41000),
+    ("Subaru", "Outback", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "2.5L H-4 gas DOHC", 152, 32000),
+    ("BMW", "X5", "Sport Utility", "Standard Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "3.0L I-6 turbo DOHC", 183, 68000),
+    ("Jeep", "Wrangler", "Sport Utility", "Small Sport Utility Vehicle 4WD", "Gasoline Fuel", 5, "3.6L V-6 gas DOHC", 220, 39000),
+]
+
+COLORS = ["Black", "White", "Silver", "Gray", "Red", "Blue", "Green", "Pearl White", "Magnetic Gray", "Midnight Blue"]
+INTERIORS = ["Black", "Gray", "Beige", "Brown", "Ivory"]
+OPTIONS = [
+    "Heated Seats", "Sunroof", "Navigation", "Apple CarPlay", "Android Auto", "Leather Seats",
+    "Blind Spot Monitor", "Adaptive Cruise Control", "Third Row Seating", "Tow Package",
+    "Premium Audio", "Backup Camera", "Remote Start", "Roof Rails", "Heated Steering Wheel",
+]
+DRIVETRAINS = ["FWD", "AWD", "4WD", "RWD"]
+TRANSMISSIONS = ["Automatic", "CVT", "8-Speed Automatic", "Manual"]
+VIN_CHARS = np.array(list("ABCDEFGHJKLMNPRSTUVWXYZ0123456789"))
+
+
+def generate_inventory(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A reproducible inventory frame with realistic value mixes and unique VINs"""
+    rng = np.random.default_rng(seed)
+    catalog = pd.DataFrame(CATALOG, columns=[
+        "Make", "Model", "MarketClass", "EPAClassification", "Fuel_Type",
+        "PassengerCapacity", "Engine_Description", "EngineDisplacementCubicInches", "BasePrice",
+    ])
+    cars = catalog.iloc[rng.integers(0, len(catalog), rows)].reset_index(drop=True)
+
+    year = rng.integers(2012, 2026, rows)
+    age = 2025 - year
+    miles = np.where(age == 0, rng.integers(0, 50, rows), rng.integers(0, 15000, rows) * np.maximum(age, 1))
+    price = cars["BasePrice"].to_numpy() * (0.92 ** age) * rng.uniform(0.9, 1.1, rows)
+    price = np.where(rng.random(rows) < 0.03, 0, np.round(price, -2)).astype(np.int64)  # 0 = call for price
+    electric = cars["Fuel_Type"].str.startswith("Electric").to_numpy()
+    city_mpg = np.where(electric, rng.integers(110, 140, rows), rng.integers(16, 52, rows))
+
+    serial = np.arange(rows)
+    vins = VIN_CHARS[rng.integers(0, len(VIN_CHARS), (rows, 9))].view("<U9").ravel()
+    vins = np.char.add(vins, np.char.zfill(serial.astype(str), 8))
+
+    option_picks = rng.random((rows, len(OPTIONS))) < 0.3
+    options = [", ".join(o for o, picked in zip(OPTIONS, row) if picked) for row in option_picks]
+
+    return pd.DataFrame({
+        "Type": np.where(age == 0, "New", "Used"),
+        "Stock": np.char.add("STK", serial.astype(str)),
+        "VIN": vins,
+        "Year": year,
+        "Make": cars["Make"],
+        "Model": cars["Model"],
+        "ModelNumber": np.char.add("MN", rng.integers(100, 999, rows).astype(str)),
+        "ExteriorColor": rng.choice(COLORS, rows),
+        "InteriorColor": rng.choice(INTERIORS, rows),
+        "Transmission": np.where(electric, "Automatic", rng.choice(TRANSMISSIONS, rows)),
+        "Miles": miles,
+        "SellingPrice": price,
+        "Options": options,
+        "Style_Description": cars["Model"] + " " + rng.choice(["LE", "XLE", "Sport", "Limited", "Base", "Touring"], rows),
+        "Engine_Block_Type": np.where(electric, "Electric", rng.choice(["I", "V", "H"], rows)),
+        "Engine_Aspiration_Type": np.where(electric, "Electric", rng.choice(["Naturally Aspirated", "Turbocharged"], rows)),
+        "Engine_Description": cars["Engine_Description"],
+        "Transmission_Description": np.where(electric, "1-Speed Automatic", rng.choice(TRANSMISSIONS, rows)),
+        "Drivetrain": rng.choice(DRIVETRAINS, rows),
+        "Fuel_Type": cars["Fuel_Type"],
+        "CityMPG": city_mpg,
+        "HighwayMPG": city_mpg + rng.integers(-10, 10, rows),
+        "EPAClassification": cars["EPAClassification"],
+        "Wheelbase_Code": rng.choice(["SWB", "LWB", "Standard"], rows),
+        "MarketClass": cars["MarketClass"],
+        "PassengerCapacity": cars["PassengerCapacity"],
+        "EngineDisplacementCubicInches": cars["EngineDisplacementCubicInches"],
+    })
+
+
+def write_inventory(rows: int, path: str, seed: int = 0) -> str:
+    generate_inventory(rows, seed).to_csv(path, index=False)
+    return path
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic inventory CSV")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_inventory(args.rows, args.path, args.seed)
+    print(f"Wrote {args.rows} cars to {args.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark ingest, retrieval, prompt assembly and end-to-end completions
+
+    python -m benchmarks.run --sizes 1000,10000,100000
+    python -m benchmarks.run --sizes 1000000 --encoder hashing
+
+Completions go to the local mock OpenAI server (src/server/mock_openai.py)
+with --llm-latency seconds of simulated model time, so no API key or spend is
+needed. Results are written as JSON to benchmarks/results/, named after the
+current commit; compare two runs with python -m benchmarks.compare.
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from benchmarks.generate_inventory import write_inventory
+from src.core.assistant import SAMPLE_QUERIES, CarSalesAssistant, Config
+from src.core.quantization import STORAGE_TYPES
+from src.server.mock_openai import start_mock_server
+
+
+class HashingEncoder:
+    """BENCHMARK ONLY: a stand-in for the sentence transformer that hashes words into buckets
+
+    Its vectors carry no meaning, so it only measures the pipeline around
+    the encoder (formatting, indexing, search) at sizes where running
+    MiniLM would take hours. Selected with --encoder hashing.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimensions
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimensions] += 1.0
+        return vectors[0] if single else vectors
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/mean of latencies, in milliseconds"""
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def bench_size(rows: int, args, base_url: str, workdir: str) -> Dict[str, Any]:
+    csv_path = os.path.join(workdir, f"cars_{rows}.csv")
+    if not os.path.exists(csv_path):
+        write_inventory(rows, csv_path, seed=args.seed)
+
+    config = Config(
+        EMBEDDING_CACHE_PATH=None,
+        OPENAI_BASE_URL=base_url,
+        VECTOR_INDEX=args.index,
+        EMBEDDING_STORAGE=args.storage,
+    )
+
+    # Cold start: model load plus reading, formatting, embedding and indexing the CSV
+    started = time.perf_counter()
+    assistant = CarSalesAssistant(config, api_key="benchmark")
+    if args.encoder == "hashing":
+        assistant._model = HashingEncoder()
+    assistant.model
+    model_seconds = time.perf_counter() - started
+    assistant.load_car_data(csv_path)
+    cold_start = time.perf_counter() - started
+    ingest_seconds = cold_start - model_seconds
+
+    queries = [
+        SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] + ("" if i < len(SAMPLE_QUERIES) else f" #{i}")
+        for i in range(args.queries)
+    ]
+
+    # Retrieval, first with every query new to the embedding cache, then repeated
+    cold_retrieval, warm_retrieval, prompt_build = [], [], []
+    results = []
+    for query in queries:
+        session = assistant.new_session()
+        t = time.perf_counter()
+        cars = assistant.get_relevant_cars(query, session=session)
+        cold_retrieval.append(time.perf_counter() - t)
+        results.append((query, cars, session))
+    for query in queries:
+        t = time.perf_counter()
+        assistant.get_relevant_cars(query, session=assistant.new_session())
+        warm_retrieval.append(time.perf_counter() - t)
+    for query, cars, session in results:
+        t = time.perf_counter()
+        assistant._build_messages(query, cars, session)
+        prompt_build.append(time.perf_counter() - t)
+
+    completions = []
+    for query in queries[:args.completions]:
+        t = time.perf_counter()
+        assistant.get_completion(query, session=assistant.new_session())
+        completions.append(time.perf_counter() - t)
+
+    result = {
+        "rows": rows,
+        "cold_start_seconds": cold_start,
+        "model_load_seconds": model_seconds,
+        "ingest_seconds": ingest_seconds,
+        "ingest_rows_per_second": rows / ingest_seconds if ingest_seconds else None,
+        "retrieval_cold": percentiles(cold_retrieval),
+        "retrieval_warm": percentiles(warm_retrieval),
+        "prompt_build": percentiles(prompt_build),
+        "completion": percentiles(completions) if completions else None,
+    }
+    if args.storage_recall:
+        # recall@k, scanned size and latency of each storage type over the same queries
+        result["storage_recall"] = assistant.benchmark_embedding_storage(queries)
+    return result
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the assistant benchmark suite")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated inventory sizes")
+    parser.add_argument("--queries", type=int, default=200, help="retrieval queries per size")
+    parser.add_argument("--completions", type=int, default=20, help="end-to-end completions per size")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mock LLM delay in seconds")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model",
+                        help="'hashing' swaps in a meaningless fast encoder (benchmark only)")
+    parser.add_argument("--index", choices=["exact", "ivf"], default="exact")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="float32")
+    parser.add_argument("--storage-recall", action="store_true",
+                        help="also compare recall@k and latency of every storage type")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="where to keep generated CSVs (default: a temp dir)")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results"))
+    args = parser.parse_args(argv)
+
+    mock = start_mock_server(latency=args.llm_latency)
+    base_url = f"http://127.0.0.1:{mock.server_address[1]}/v1"
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.data_dir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        runs = []
+        for rows in sizes:
+            result = bench_size(rows, args, base_url, workdir)
+            runs.append(result)
+            print(json.dumps(result, indent=2), file=sys.stderr)
+    mock.shutdown()
+
+    revision = git_revision()
+    report = {
+        **revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "data_dir")},
+        "runs": runs,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.out, f"{stamp}-{revision['commit']}{'-dirty' if revision['dirty'] else ''}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
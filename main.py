@@ -1,11 +1,19 @@
+import asyncio
+import logging
+
 import flet as ft
 from flet_contrib.color_picker import ColorPicker
 
-from src.ui.widgets import ChatItem
-from src.core.chat import get_bot_response
+from src.ui.widgets import Transcript, UpdateThrottle
+from src.core.chat import (is_ready, listen_and_retrieve, new_session, remove_progress_listener,
+                           stream_bot_response, warm_up)
 
 user_config = {"dark_mode": True}
 
+logger = logging.getLogger(__name__)
+
+ERROR_REPLY = "Sorry, something went wrong. Please try again."
+
 
 def main(page: ft.Page):
     page.title = "Maestro"
@@ -36,7 +44,7 @@ def main(page: ft.Page):
         bgcolor=ft.colors.ON_PRIMARY,
     )
 
-    chat_box = ft.ListView(expand=8, auto_scroll=True)
+    chat_box = Transcript(expand=8)
 
     user_input = ft.TextField(
         hint_text="Type your message",
@@ -69,6 +77,7 @@ def main(page: ft.Page):
     )
 
     loading_gif = ft.Image(src="loading.gif", width=50, height=20, visible=False)
+    engine_status = ft.Text("Starting up...", size=12, italic=True)
 
     #    def change_debug(e):
     #        page.show_semantics_debugger = not page.show_semantics_debugger
@@ -142,21 +151,77 @@ def main(page: ft.Page):
     #     # page.add(new_message, send_button)
     #     page.update()
 
+    # Each window (or browser tab in web mode) gets its own conversation
+    session = new_session()
+
+    # The reply currently being generated; a newer message cancels it
+    pending = {"task": None}
+
+    def start_reply(handler, *args):
+        if pending["task"] is not None and not pending["task"].done():
+            pending["task"].cancel()
+        pending["task"] = page.run_task(handler, *args)
+
+    def show_error(error):
+        # Without this the loading indicator would spin with no reply
+        logger.error(f"Reply failed: {str(error)}")
+        loading_gif.visible = False
+        chat_box.add("bot", ERROR_REPLY)
+        page.update()
+
+    async def reply_to(user_message, relevant_cars=None):
+        bot_item = None
+        throttle = UpdateThrottle(page)
+        stream = stream_bot_response(user_message, session, relevant_cars)
+        try:
+            async for delta in stream:
+                if bot_item is None:
+                    # First token: swap the loading indicator for the reply
+                    bot_item = chat_box.add("bot", "")
+                    loading_gif.visible = False
+                bot_item.append_text(delta)
+                throttle.request()
+        except asyncio.CancelledError:
+            await stream.aclose()
+            return
+        except Exception as e:
+            show_error(e)
+            return
+
+        loading_gif.visible = False
+        throttle.flush()
+
+    async def listen_and_reply():
+        try:
+            # Cars are retrieved from partial transcripts while the user speaks
+            user_query, relevant_cars = await listen_and_retrieve(session)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            # No microphone or PyAudio, a missing vosk model, recognition offline, a failed warm-up...
+            show_error(e)
+            return
+        if not user_query:
+            # Nothing was heard before the listen timeout
+            loading_gif.visible = False
+            page.update()
+            return
+
+        chat_box.add("user", user_query)
+        page.update()
+        await reply_to(user_query, relevant_cars)
+
     def on_send(e):
         user_message = user_input.value
-        chat_box.controls.append(ChatItem("user", user_message))
+        if not user_message:
+            return
+        chat_box.add("user", user_message)
         user_input.value = ""
-        user_input.disabled = True
         send_button.disabled = True
         loading_gif.visible = True
         page.update()
 
-        _, bot_reply = get_bot_response(user_message)
-
-        chat_box.controls.append(ChatItem("bot", bot_reply))
-        user_input.disabled = False
-        loading_gif.visible = False
-        page.update()
+        start_reply(reply_to, user_message)
 
     def on_audio_send(e):
         # user_message = user_input.value
@@ -164,28 +229,37 @@ def main(page: ft.Page):
         #     ChatItem("user", user_message)
         # )
         user_input.value = ""
-        user_input.disabled = True
         send_button.disabled = True
         loading_gif.visible = True
         page.update()
 
-        user_query, bot_reply = get_bot_response()
-
-        chat_box.controls.append(ChatItem("user", user_query))
-        chat_box.controls.append(ChatItem("bot", bot_reply))
-        user_input.disabled = False
-        loading_gif.visible = False
-        page.update()
+        start_reply(listen_and_reply)
 
     user_input.on_change = check_content
     user_input.on_submit = on_send
     send_button.on_click = on_send
     audio_button.on_click = on_audio_send
 
-    app_body.controls += [chat_box, loading_gif, input_area]
+    app_body.controls += [chat_box, loading_gif, engine_status, input_area]
 
     page.appbar = app_bar
     page.add(app_body)
 
+    # Messages sent before the model and inventory are loaded are held until
+    # they are; meanwhile show what the engine is doing
+    def on_engine_progress(stage, finished):
+        engine_status.value = stage + ("" if finished else "...")
+        # A failure stays on screen
+        engine_status.visible = not is_ready()
+        page.update()
+
+    warm_up(on_engine_progress)
+    # A tab closed during warm-up must not keep its page alive
+    page.on_close = lambda e: remove_progress_listener(on_engine_progress)
+
+
+# Start loading the engine while the window opens
+warm_up()
+
 
 ft.app(target=main)
@@ -1,23 +1,57 @@
 import os
+import re
+import time
+import asyncio
 import logging
 import json
+import threading
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, AsyncIterator, Callable, Iterator
 from dataclasses import dataclass
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from openai import AsyncOpenAI, OpenAI
+from .cache import LRUCache, ResponseCache
+from .embedding_cache import EmbeddingCache
+from .index_artifact import load_index, save_index
+from .prompt import (INVENTORY_HEADER, REFERENCE_HEADER, REFERENCE_INSTRUCTIONS,
+                     SALES_INSTRUCTIONS, PromptBuilder, TokenCounter)
+from .inventory import CarTable, Inventory, build_car_table, filter_columns, strings_nbytes, validate_inventory
+from .filters import SEATING_UNITS, extract_constraints
+from .metrics import Metrics, QueryTrace
+from .session import ChatSession
+from .quantization import check_storage, spill_to_disk
+from .vector_index import (VectorIndex, benchmark_storage, build_index, index_nbytes, normalize_rows,
+                           recall_at_k, top_k_rows)
 
 @dataclass
 class Config:
     """Configuration settings for the car sales assistant"""
     OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_BASE_URL: Optional[str] = None  # e.g. a local mock server; None uses OPENAI_BASE_URL or api.openai.com
     MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"  # sentence-transformers model
     MAX_TOKENS: int = 300
     TEMPERATURE: float = 0.7
     TOP_K_RESULTS: int = 3
     MAX_HISTORY_TURNS: int = 10
+    MAX_INPUT_TOKENS: int = 4000  # budget for instructions, cars, history and query sent to the LLM
+    EMBEDDING_CACHE_PATH: Optional[str] = "data/embedding_cache.npz"  # None disables the on-disk cache
+    INVENTORY_POLL_SECONDS: float = 30.0  # how often watch_car_data checks the CSV for changes
+    VECTOR_INDEX: str = "exact"  # "exact" or "ivf" (approximate, for large multi-lot inventories)
+    ANN_MIN_ROWS: int = 20000  # inventories smaller than this always use exact search
+    IVF_LISTS: int = 0  # number of k-means buckets, 0 picks about 2 * sqrt(rows)
+    IVF_PROBES: int = 8  # buckets scanned per query; raise for recall, lower for latency
+    IVF_TRAIN_ITERATIONS: int = 10
+    EMBEDDING_STORAGE: str = "float32"  # "int8" scans a quantized copy; float32 rows move to disk
+    EMBEDDING_SPILL_DIR: Optional[str] = None  # where int8 storage spills float32 rows; None is the temp dir (often RAM)
+    RESCORE_FACTOR: int = 4  # quantized candidates per result rescored in float32
+    QUERY_CACHE_SIZE: int = 1024  # query embeddings kept in the LRU cache, 0 disables it
+    QUERY_CACHE_TTL: float = 3600.0  # seconds before a cached query embedding expires, 0 never
+    BATCH_SCORE_ELEMENTS: int = 16_000_000  # max query x car scores held at once by batch retrieval
+    METRICS_SAMPLE_RATE: float = 1.0  # share of queries traced for stage timings, 0 disables tracing
+    RESPONSE_CACHE_ENABLED: bool = False  # reuse replies to near-identical questions about the same cars
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_TTL: float = 600.0  # seconds before a cached reply expires, 0 never
+    RESPONSE_CACHE_THRESHOLD: float = 0.95  # min cosine similarity between queries to reuse a reply
 
 def setup_logging():
     """Configure logging settings"""
@@ -29,6 +63,51 @@ def setup_logging():
 
 logger = setup_logging()
 
+def build_search_index(embeddings: np.ndarray, config: Config) -> VectorIndex:
+    """Build the vector index configured in config over normalized embeddings"""
+    return build_index(
+        embeddings,
+        config.VECTOR_INDEX,
+        min_rows=config.ANN_MIN_ROWS,
+        storage=config.EMBEDDING_STORAGE,
+        rescore_factor=config.RESCORE_FACTOR,
+        n_lists=config.IVF_LISTS,
+        n_probe=config.IVF_PROBES,
+        train_iterations=config.IVF_TRAIN_ITERATIONS,
+    )
+
+@dataclass
+class PreparedTurn:
+    """A query ready for the LLM: either a cached reply or the messages to send"""
+    user_query: str
+    session: ChatSession
+    cached: Optional[str] = None
+    cache_key: Optional[tuple] = None
+    messages: Optional[List[Dict[str, str]]] = None
+    picks: Optional[List[str]] = None  # new last_recommendations, committed once the reply is complete
+
+NO_MATCHING_CARS = "No vehicles in the current inventory match the customer's requirements"
+NO_CAR_DATA = "No car data available"
+RETRIEVAL_ERROR = "Error retrieving car information"
+FALLBACK_REPLY = "I apologize, but I'm having trouble processing your request. Please try again."
+# The VIN field of a formatted car document
+VIN_FIELD = re.compile(r"\bVIN: ([^,]+)")
+
+# Customer-style questions for recall and storage checks; inventory rows
+# make poor queries since each one is its own nearest neighbour
+SAMPLE_QUERIES = [
+    "Do you have a red SUV?",
+    "I need a family car with a third row under $40k",
+    "Looking for an electric car with low mileage",
+    "Any AWD trucks from 2020 or newer?",
+    "What hybrids do you have between $20k and $30k?",
+    "Show me a cheap sedan with good gas mileage",
+    "I want a Toyota with heated seats and a sunroof",
+    "Something with 7 seats for road trips",
+    "Diesel pickup for towing",
+    "Best car for a new driver on a budget",
+]
+
 class CarSalesAssistant:
     def __init__(self, config: Optional[Config] = None, api_key=None):
         """Initialize the car sales assistant"""
@@ -36,22 +115,103 @@ class CarSalesAssistant:
         self.api_key = api_key
         self._validate_config()
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=api_key)
+        # Initialize OpenAI clients
+        self.client = OpenAI(api_key=api_key, base_url=self.config.OPENAI_BASE_URL)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=self.config.OPENAI_BASE_URL)
+        
+        # The sentence transformer is loaded on first use (see the model
+        # property). Its tokenizer is not safe to call from several threads
+        # at once, so encoding is serialized
+        self._model = None
+        self._encode_lock = threading.Lock()
+        
+        # Initialize tracing; set self.metrics.callback to receive each sampled QueryTrace
+        self.metrics = Metrics(self.config.METRICS_SAMPLE_RATE)
+        
+        # Initialize prompt assembly
+        self.prompt_builder = PromptBuilder(
+            TokenCounter(self.config.OPENAI_MODEL),
+            self.config.MAX_INPUT_TOKENS,
+            self.config.MAX_HISTORY_TURNS,
+        )
+        
+        # Initialize query embedding cache
+        self.query_cache = LRUCache(self.config.QUERY_CACHE_SIZE, self.config.QUERY_CACHE_TTL)
         
-        # Initialize sentence transformer
-        self.model = SentenceTransformer(self.config.MODEL_NAME)
+        # Initialize response cache (opt-in: a hit ignores differences in earlier turns)
+        self.response_cache = None
+        if self.config.RESPONSE_CACHE_ENABLED:
+            self.response_cache = ResponseCache(
+                self.config.RESPONSE_CACHE_SIZE,
+                self.config.RESPONSE_CACHE_TTL,
+                self.config.RESPONSE_CACHE_THRESHOLD,
+            )
+        
+        # Initialize on-disk embedding cache
+        self.embedding_cache = None
+        if self.config.EMBEDDING_CACHE_PATH:
+            self.embedding_cache = EmbeddingCache(self.config.EMBEDDING_CACHE_PATH, self.config.MODEL_NAME)
         
         # Initialize storage
-        self.embeddings = None
-        self.documents = None
-        self.conversation_history = []
-        self.last_recommendations = []  # Cache for recommendations
+        self.inventory: Optional[Inventory] = None
+        self._sync_lock = threading.Lock()
+        self._watch_stop: Optional[threading.Event] = None
+        
+        # Conversation state used when no session is passed in
+        self.default_session = ChatSession()
+    
+    @property
+    def model(self):
+        """Sentence transformer, imported and loaded on first use
+        
+        Importing sentence_transformers pulls in torch, which takes seconds,
+        so it stays off the import path of this module.
+        """
+        if self._model is None:
+            with self._encode_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"Loading sentence transformer {self.config.MODEL_NAME}")
+                    self._model = SentenceTransformer(self.config.MODEL_NAME)
+        return self._model
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Conversation history of the default session"""
+        return self.default_session.conversation_history
+    
+    @conversation_history.setter
+    def conversation_history(self, value: List[Dict[str, str]]) -> None:
+        self.default_session.conversation_history = value
+    
+    @property
+    def last_recommendations(self) -> List[str]:
+        """Last recommendations of the default session"""
+        return self.default_session.last_recommendations
+    
+    @last_recommendations.setter
+    def last_recommendations(self, value: List[str]) -> None:
+        self.default_session.last_recommendations = value
+    
+    def new_session(self) -> ChatSession:
+        """Create conversation state for a new customer sharing this engine"""
+        return ChatSession()
+    
+    @property
+    def documents(self) -> Optional[CarTable]:
+        """Formatted documents of the currently published inventory, rendered on demand"""
+        return self.inventory.documents if self.inventory is not None else None
+    
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        """Embedding matrix of the currently published inventory"""
+        return self.inventory.embeddings if self.inventory is not None else None
     
     def _validate_config(self) -> None:
         """Validate configuration settings"""
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
+        check_storage(self.config.EMBEDDING_STORAGE)
     
     def format_car_document(self, car_data: Dict[str, Any]) -> str:
         """Format car data into a readable string"""
@@ -89,288 +249,764 @@ class CarSalesAssistant:
             logger.error(f"Missing required field in car data: {e}")
             return ""
     
+    def _read_car_documents(self, csv_path: str) -> Tuple[CarTable, List[str], List[str], Dict[str, Any]]:
+        """Read a CSV and return its columnar table, rendered documents, VINs and filter columns"""
+        df, report = validate_inventory(pd.read_csv(csv_path))
+        if any(report.dropped.values()):
+            logger.warning(f"Formatted {csv_path}: {report}")
+        else:
+            logger.info(f"Formatted {csv_path}: {report}")
+        
+        table, documents = build_car_table(df)
+        logger.info(
+            f"Inventory table holds {len(table)} cars in {table.nbytes / 1e6:.1f} MB "
+            f"({strings_nbytes(documents) / 1e6:.1f} MB as formatted strings)"
+        )
+        return table, documents, df["VIN"].tolist(), filter_columns(df)
+    
     def load_car_data(self, csv_path: str) -> None:
         """Load and embed car data from CSV file"""
         try:
             logger.info(f"Loading car data from {csv_path}")
-            df = pd.read_csv(csv_path)
+            with self._sync_lock:
+                self._full_load(csv_path)
             
-            self.documents = []
-            for _, row in df.iterrows():
-                doc = self.format_car_document(row)
-                if doc:
-                    self.documents.append(doc)
+        except Exception as e:
+            logger.error(f"Error loading car data: {str(e)}")
+            raise
+    
+    def _full_load(self, csv_path: str) -> int:
+        """Build and publish a fresh inventory; caller holds the sync lock"""
+        table, documents, vins, columns = self._read_car_documents(csv_path)
+        
+        if not documents:
+            logger.warning("No valid car documents to load")
+            return 0
+        
+        logger.info("Creating embeddings for car documents")
+        embeddings = self._embed_documents(documents)
+        self._save_embedding_cache(documents)
+        
+        self._publish(table, embeddings, vins, columns)
+        logger.info(f"Successfully loaded {len(documents)} cars")
+        return len(documents)
+    
+    def sync_car_data(self, csv_path: str) -> Dict[str, int]:
+        """Diff a fresh CSV against the loaded inventory by VIN and swap in the result
+        
+        Unchanged cars keep their existing embedding rows, added or modified cars
+        are re-embedded and sold cars are dropped. The new inventory is published
+        in one assignment, so queries running meanwhile see either the old or the
+        new snapshot, never a mix.
+        """
+        with self._sync_lock:
+            current = self.inventory
+            if current is None:
+                logger.info("No inventory loaded yet, doing a full load")
+                added = self._full_load(csv_path)
+                return {"added": added, "modified": 0, "removed": 0, "unchanged": 0}
             
-            if not self.documents:
-                logger.warning("No valid car documents to load")
-                return
+            table, documents, vins, columns = self._read_car_documents(csv_path)
+            if not documents:
+                logger.warning(f"{csv_path} has no valid cars, keeping the current inventory")
+                return {"added": 0, "modified": 0, "removed": 0, "unchanged": len(current)}
             
-            logger.info("Creating embeddings for car documents")
-            self.embeddings = self.model.encode(self.documents)
+            reused_rows, reused_positions, changed_positions = [], [], []
+            added = 0
+            for pos, (vin, doc) in enumerate(zip(vins, documents)):
+                row = current.rows_by_vin.get(vin)
+                if row is not None and current.documents.row_equals(row, doc):
+                    reused_rows.append(row)
+                    reused_positions.append(pos)
+                else:
+                    changed_positions.append(pos)
+                    added += row is None
+            removed = len(current.rows_by_vin.keys() - set(vins))
+            stats = {
+                "added": added,
+                "modified": len(changed_positions) - added,
+                "removed": removed,
+                "unchanged": len(reused_positions),
+            }
             
-            logger.info(f"Successfully loaded {len(self.documents)} cars")
+            if not changed_positions and not removed and len(documents) == len(current):
+                logger.info("Inventory unchanged")
+                return stats
             
-        except Exception as e:
-            logger.error(f"Error loading car data: {str(e)}")
-            raise
+            embeddings = np.empty((len(documents), current.embeddings.shape[1]), dtype=np.float32)
+            embeddings[reused_positions] = current.embeddings[reused_rows]
+            if changed_positions:
+                embeddings[changed_positions] = self._embed_documents(
+                    [documents[i] for i in changed_positions]
+                )
+            self._save_embedding_cache(documents)
+            
+            self._publish(table, embeddings, vins, columns)
+        
+        logger.info(f"Synced inventory from {csv_path}: {stats}")
+        return stats
+    
+    def _publish(self, documents: CarTable, embeddings: np.ndarray, vins: List[str],
+                 columns: Dict[str, Any]) -> None:
+        """Normalize embeddings, build the search index and swap in the new inventory"""
+        embeddings = normalize_rows(embeddings)
+        if self.config.EMBEDDING_STORAGE != "float32":
+            # Only rescoring reads full-precision rows, so keep them out of RAM
+            embeddings = spill_to_disk(embeddings, self.config.EMBEDDING_SPILL_DIR)
+        index = build_search_index(embeddings, self.config)
+        self.inventory = Inventory(documents, embeddings, vins, index, columns)
+        logger.info(
+            f"Built {type(index).__name__} over {len(documents)} cars "
+            f"({self.config.EMBEDDING_STORAGE}, {index_nbytes(index) / 1e6:.1f} MB resident)"
+        )
+    
+    def save_index(self, path: str) -> Dict[str, Any]:
+        """Write the loaded inventory as an index artifact other workers can open with load_index"""
+        inventory = self.inventory
+        if inventory is None:
+            raise ValueError("No car data loaded")
+        return save_index(inventory, path, self.config.MODEL_NAME)
+    
+    def load_index(self, path: str) -> Dict[str, Any]:
+        """Serve a prebuilt index artifact, memory-mapped instead of re-encoding the CSV
+        
+        Raises ValueError if the artifact was built with a different embedding
+        model, since its vectors would not be comparable with query vectors.
+        """
+        with self._sync_lock:
+            inventory, manifest = load_index(path, n_probe=self.config.IVF_PROBES)
+            if manifest["model_name"] != self.config.MODEL_NAME:
+                raise ValueError(
+                    f"Index artifact {path} was built with {manifest['model_name']}, "
+                    f"not {self.config.MODEL_NAME}"
+                )
+            self.inventory = inventory
+        return manifest
+    
+    def check_index_recall(self, queries: Optional[List[str]] = None, k: Optional[int] = None) -> float:
+        """Measure recall@k of the active index against exact search
+        
+        Uses the given queries, or SAMPLE_QUERIES when none are given. Run this
+        after changing the IVF settings to check the recall/latency trade-off.
+        """
+        inventory = self.inventory
+        if inventory is None:
+            raise ValueError("No car data loaded")
+        k = k or self.config.TOP_K_RESULTS
+        query_vectors = normalize_rows(self._encode(queries or SAMPLE_QUERIES))
+        recall = recall_at_k(inventory.index, query_vectors, k)
+        logger.info(f"{type(inventory.index).__name__} recall@{k}: {recall:.3f} over {len(query_vectors)} queries")
+        return recall
+    
+    def benchmark_embedding_storage(self, queries: Optional[List[str]] = None,
+                                    k: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        """Compare recall@k, memory and latency of float32 and int8 storage
+        
+        Uses the given queries, or SAMPLE_QUERIES as in check_index_recall.
+        """
+        inventory = self.inventory
+        if inventory is None:
+            raise ValueError("No car data loaded")
+        k = k or self.config.TOP_K_RESULTS
+        embeddings = np.ascontiguousarray(inventory.embeddings)
+        results = benchmark_storage(
+            embeddings,
+            normalize_rows(self._encode(queries or SAMPLE_QUERIES)),
+            k,
+            kind=self.config.VECTOR_INDEX,
+            min_rows=self.config.ANN_MIN_ROWS,
+            rescore_factor=self.config.RESCORE_FACTOR,
+            n_lists=self.config.IVF_LISTS,
+            n_probe=self.config.IVF_PROBES,
+            train_iterations=self.config.IVF_TRAIN_ITERATIONS,
+        )
+        for storage, result in results.items():
+            logger.info(f"{storage}: {result}")
+        return results
+    
+    def watch_car_data(self, csv_path: str, interval: Optional[float] = None) -> None:
+        """Poll the CSV in a background thread and sync whenever it changes"""
+        self.stop_watching()
+        interval = interval or self.config.INVENTORY_POLL_SECONDS
+        stop = threading.Event()
+        self._watch_stop = stop
+        
+        def file_signature():
+            try:
+                stat = os.stat(csv_path)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                return None
+        
+        def poll():
+            last_seen = file_signature()
+            while not stop.wait(interval):
+                signature = file_signature()
+                if signature is None or signature == last_seen:
+                    continue
+                last_seen = signature
+                try:
+                    self.sync_car_data(csv_path)
+                except Exception as e:
+                    logger.error(f"Error syncing car data: {str(e)}")
+        
+        threading.Thread(target=poll, name="inventory-watch", daemon=True).start()
+        logger.info(f"Watching {csv_path} for inventory changes every {interval}s")
+    
+    def stop_watching(self) -> None:
+        """Stop a watch started by watch_car_data"""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+    
+    def _encode(self, texts) -> np.ndarray:
+        """Run the sentence transformer, one caller at a time"""
+        model = self.model
+        with self._encode_lock:
+            return np.asarray(model.encode(texts), dtype=np.float32)
+    
+    def _embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embed documents, only running the model on rows missing from the cache"""
+        if self.embedding_cache is None:
+            return self._encode(documents)
+        
+        keys = [self.embedding_cache.key(doc) for doc in documents]
+        embeddings, missing = self.embedding_cache.lookup(keys)
+        logger.info(f"Embedding cache: {len(documents) - len(missing)} hits, {len(missing)} misses")
+        
+        if missing:
+            fresh = self._encode([documents[i] for i in missing])
+            if embeddings is None:
+                embeddings = np.asarray(fresh, dtype=np.float32)
+            else:
+                embeddings[missing] = fresh
+            self.embedding_cache.put([keys[i] for i in missing], fresh)
+        
+        return embeddings
+    
+    def _save_embedding_cache(self, documents: List[str]) -> None:
+        """Persist the embedding cache, pruned to the given inventory"""
+        if self.embedding_cache is None:
+            return
+        try:
+            self.embedding_cache.save(retain=[self.embedding_cache.key(doc) for doc in documents])
+        except OSError as e:
+            logger.warning(f"Could not write embedding cache: {str(e)}")
     
     def is_reference_query(self, query: str) -> Tuple[bool, int]:
         """Check if query is referencing a previous recommendation"""
         reference_mapping = {
-            'first': 0, 'first one': 0, '1': 0,
-            'second': 1, 'second one': 1, '2': 1,
-            'third': 2, 'third one': 2, '3': 2
+            'first': 0, 'first one': 0, '1st': 0, '1': 0,
+            'second': 1, 'second one': 1, '2nd': 1, '2': 1,
+            'third': 2, 'third one': 2, '3rd': 2, '3': 2
         }
         
         query_lower = query.lower()
         for ref, idx in reference_mapping.items():
-            if ref in query_lower:
-                logger.info(f"Detected reference query: {ref} -> index {idx}")
+            # Whole words only, so prices, years, "third row" and seat counts are not references
+            if re.search(rf"(?<![\w$,.])(?<!seats )(?<!seat ){re.escape(ref)}"
+                         rf"(?![\w,.]|[- ]row|\s*-?\s*{SEATING_UNITS}\b)", query_lower):
+                logger.debug("Detected reference query: %s -> index %d", ref, idx)
                 return True, idx
         return False, -1
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Get embedding using sentence transformer"""
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """Canonical form of a query for caching
+        
+        The MiniLM tokenizer lowercases and splits on whitespace, so case and
+        spacing differences do not change the embedding.
+        """
+        return " ".join(text.lower().split())
+    
+    def _encode_query(self, text: str) -> np.ndarray:
+        """Encode a query, skipping the model when the same query was seen recently"""
+        key = self.normalize_query(text)
+        embedding = self.query_cache.get(key)
+        if embedding is not None:
+            self.metrics.count("query_cache_hits")
+            return embedding
+        self.metrics.count("query_cache_misses")
+        
         try:
-            embedding = self.model.encode(text)
-            return embedding.tolist()
+            embedding = self._encode(text)
         except Exception as e:
             logger.error(f"Error getting embedding: {str(e)}")
             raise
+        
+        self.query_cache.put(key, embedding)
+        return embedding
+    
+    def get_embedding(self, text: str) -> List[float]:
+        """Get embedding using sentence transformer"""
+        return self._encode_query(text).tolist()
+    
+    def _query_vector(self, text: str) -> np.ndarray:
+        """Get the L2-normalized float32 embedding of a query"""
+        return normalize_rows(self._encode_query(text))[0]
     
-    def get_relevant_cars(self, query: str, threshold: float = 0.2) -> str:
+    def _constraint_mask(self, query: str, inventory: Inventory) -> Optional[np.ndarray]:
+        """Row mask for the hard constraints in a query, or None if it states none"""
+        constraints = extract_constraints(query)
+        if not constraints:
+            return None
+        candidates = constraints.mask(inventory.columns)
+        logger.debug("Query constraints %s leave %d of %d cars", constraints, candidates.sum(), len(inventory))
+        return candidates
+    
+    def _select_relevant(self, sorted_indices: np.ndarray, scores: np.ndarray, threshold: float) -> List[int]:
+        """Pick results from ranked candidates using the similarity threshold"""
+        relevant_indices = []
+        for i, score in enumerate(scores):
+            if score >= threshold or len(relevant_indices) < self.config.TOP_K_RESULTS:
+                relevant_indices.append(sorted_indices[i])
+                logger.debug("Selected document %d with score %.3f", i, score)
+            if len(relevant_indices) >= self.config.TOP_K_RESULTS:
+                break
+        return relevant_indices
+    
+    def get_relevant_cars(self, query: str, threshold: float = 0.2,
+                          session: Optional[ChatSession] = None) -> str:
         """Get relevant cars based on query"""
-        if self.embeddings is None or not self.documents:
+        with self.metrics.trace("retrieval"):
+            return self._get_relevant_cars(query, threshold, session)
+    
+    def _get_relevant_cars(self, query: str, threshold: float, session: Optional[ChatSession]) -> str:
+        session = session or self.default_session
+        recommendations, picks = self._search(query, threshold, self.inventory, session.last_recommendations)
+        if picks is not None:
+            session.last_recommendations = picks
+        return recommendations
+    
+    @staticmethod
+    def _current_document(document: str, inventory: Inventory) -> Optional[str]:
+        """A recommended car as the inventory describes it now, or None if it is gone"""
+        match = VIN_FIELD.search(document)
+        row = inventory.rows_by_vin.get(match.group(1)) if match else None
+        if row is None:
+            return None
+        if inventory.documents.row_equals(row, document):
+            return document
+        return inventory.documents[row]
+    
+    def _search(self, query: str, threshold: float, inventory: Optional[Inventory],
+                last_recommendations: List[str]) -> Tuple[str, Optional[List[str]]]:
+        """Retrieve cars for a query without touching the session
+        
+        Returns the recommendations text and the new last_recommendations,
+        or None when they should stay as they are. Being side-effect free,
+        it can run speculatively on a partial transcript.
+        """
+        if inventory is None or not len(inventory):
             logger.warning("No car data available")
-            return "No car data available"
+            return NO_CAR_DATA, None
         
         # Check if query references previous recommendations
         is_ref, ref_idx = self.is_reference_query(query)
-        if is_ref and self.last_recommendations:
-            if ref_idx < len(self.last_recommendations):
-                logger.info(f"Using cached recommendation at index {ref_idx}")
-                return self.last_recommendations[ref_idx]
+        if is_ref and last_recommendations:
+            if ref_idx < len(last_recommendations):
+                # A sync may have sold or repriced the car since it was recommended
+                pick = last_recommendations[ref_idx]
+                current = self._current_document(pick, inventory)
+                if current == pick:
+                    logger.debug("Using cached recommendation at index %d", ref_idx)
+                    return pick, None
+                if current is not None:
+                    logger.debug("Refreshing changed recommendation at index %d", ref_idx)
+                    picks = list(last_recommendations)
+                    picks[ref_idx] = current
+                    return current, picks
+                logger.debug("Recommendation at index %d is no longer in stock, searching again", ref_idx)
         
         try:
-            logger.info(f"Creating embedding for query: {query}")
-            query_embedding = self.get_embedding(query)
-            
-            similarities = cosine_similarity([query_embedding], self.embeddings)[0]
+            # Apply hard constraints first so the dense search only ranks possible cars
+            with self.metrics.stage("constraints"):
+                candidates = self._constraint_mask(query, inventory)
+            if candidates is not None and not candidates.any():
+                return NO_MATCHING_CARS, []
             
-            sorted_indices = np.argsort(similarities)[::-1]
-            scores = similarities[sorted_indices]
+            logger.debug("Creating embedding for query: %s", query)
+            with self.metrics.stage("embedding"):
+                query_embedding = self._query_vector(query)
             
-            relevant_indices = []
-            for i, score in enumerate(scores):
-                if score >= threshold or len(relevant_indices) < self.config.TOP_K_RESULTS:
-                    relevant_indices.append(sorted_indices[i])
-                    logger.debug(f"Selected document {i} with score {score:.3f}")
-                if len(relevant_indices) >= self.config.TOP_K_RESULTS:
-                    break
+            # Rows are pre-normalized, so the index scores are cosine similarities
+            with self.metrics.stage("search"):
+                sorted_indices, scores = inventory.index.search(
+                    query_embedding, self.config.TOP_K_RESULTS, candidates
+                )
+                relevant_indices = self._select_relevant(sorted_indices, scores, threshold)
             
-            self.last_recommendations = [self.documents[i] for i in relevant_indices]
-            recommendations = "\n".join(self.last_recommendations)
+            with self.metrics.stage("render"):
+                picks = [inventory.documents[i] for i in relevant_indices]
+                recommendations = "\n".join(picks)
             
-            logger.info(f"Found {len(relevant_indices)} relevant cars")
-            return recommendations
+            logger.debug("Found %d relevant cars", len(relevant_indices))
+            return recommendations, picks
             
         except Exception as e:
             logger.error(f"Error in get_relevant_cars: {str(e)}")
-            return "Error retrieving car information"
+            return RETRIEVAL_ERROR, None
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode many queries with one model call, reusing cached embeddings"""
+        keys = [self.normalize_query(query) for query in queries]
+        embeddings = {}
+        for key in dict.fromkeys(keys):
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                embeddings[key] = cached
+        
+        # Encode each distinct uncached query once
+        missing = {}
+        for key, query in zip(keys, queries):
+            if key not in embeddings:
+                missing.setdefault(key, query)
+        if missing:
+            fresh = self._encode(list(missing.values()))
+            for key, embedding in zip(missing, fresh):
+                self.query_cache.put(key, embedding)
+                embeddings[key] = embedding
+        
+        return normalize_rows(np.stack([embeddings[key] for key in keys]))
+    
+    def get_relevant_cars_batch(self, queries: List[str], threshold: float = 0.2) -> List[str]:
+        """Get relevant cars for many queries at once
+        
+        All queries are encoded in one model call and scored with matrix-matrix
+        products against the whole inventory, in chunks bounded by
+        Config.BATCH_SCORE_ELEMENTS. Search is always exact, whatever index is
+        configured. Unlike get_relevant_cars this neither resolves references
+        to earlier picks nor updates last_recommendations, so it is safe for
+        offline jobs such as lead matching.
+        """
+        inventory = self.inventory
+        if inventory is None or not len(inventory):
+            logger.warning("No car data available")
+            return [NO_CAR_DATA] * len(queries)
+        if not queries:
+            return []
+        
+        try:
+            masks = [self._constraint_mask(query, inventory) for query in queries]
+            query_embeddings = self._encode_queries(queries)
+            
+            k = self.config.TOP_K_RESULTS
+            chunk_size = max(1, self.config.BATCH_SCORE_ELEMENTS // len(inventory))
+            results = []
+            for start in range(0, len(queries), chunk_size):
+                scores = query_embeddings[start:start + chunk_size] @ inventory.embeddings.T
+                for row, mask in enumerate(masks[start:start + chunk_size]):
+                    if mask is not None:
+                        scores[row, ~mask] = -np.inf
+                ranked, ranked_scores = top_k_rows(scores, k)
+                
+                for row, mask in enumerate(masks[start:start + chunk_size]):
+                    if mask is not None and not mask.any():
+                        results.append(NO_MATCHING_CARS)
+                        continue
+                    eligible = np.isfinite(ranked_scores[row])
+                    relevant_indices = self._select_relevant(
+                        ranked[row][eligible], ranked_scores[row][eligible], threshold
+                    )
+                    results.append("\n".join(inventory.documents[i] for i in relevant_indices))
+            
+            logger.info(f"Retrieved cars for {len(queries)} queries")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in get_relevant_cars_batch: {str(e)}")
+            raise
     
     def create_system_prompt(self, relevant_cars: str) -> str:
         """Create general system prompt"""
-        base_prompt = """You are Hennyi, an experienced car salesperson who is professional, adaptive, and focused on closing deals. Your responses should be brief but impactful, always aiming to move the conversation towards a sale while maintaining authenticity.
-
-[CRITICAL RULES: 
-1. Only recommend vehicles that exist in the provided csv file.
-2. When encountering a vehicle with price showing as $0:
-   - Do not mention the actual $0 price
-   - Instead say "Price: Contact for special pricing"
-   - If customer asks specifically about that vehicle's price, respond with "This vehicle has special pricing. I'd be happy to discuss the details in person or over the phone."
-   - Focus on the vehicle's features and benefits
-   - Encourage direct contact for pricing discussion
-3. For all vehicles with regular pricing:
-   - Always show the actual price
-   - Be transparent about all costs
-4. Never make up or guess prices]
-
-[Vehicle Classification Rules]
-    
-Electric Vehicles (EV):
-Pure electric vehicle
-Examples: Tesla, Nissan Leaf
-Hybrid Vehicles:
-Combines gas engine and electric motor
-Examples: Toyota Prius, Ford Fusion Hybrid
-Traditional Vehicles:
-Gas or diesel engines only
-
-THINKING FRAMEWORK:
-
-1. Customer Understanding Phase
-- Interpret customer's explicit and implicit needs
-- Analyze customer's communication style and mood
-- Identify key buying signals or objections
-- Consider customer's price sensitivity
-- Map customer requests to available inventory
-
-2. Vehicle Matching Process
-- Compare customer needs with available inventory
-- Consider multiple vehicle options
-- Evaluate price alignment
-- Assess feature relevance
-- Prepare alternative suggestions
-
-3. Response Strategy Development
-- Choose appropriate communication style
-- Structure information hierarchy
-- Plan closing technique
-- Prepare for potential objections
-- Design next steps
-
-Core Response Behaviors:
-
-1. Response Style
-- Keep all responses under 3 sentences unless specifically asked for details
-- Always shows three possible options
-- Lead with the most relevant information first
-- Use natural, conversational language
-- Maintain professionalism even when faced with casual or rude behavior
-
-2. Sales Strategy
-- Always include price ranges when mentioning specific models
-- When introducing specific models, always bring proper length of details
-- Respond to budget-related keywords (like "broke", "expensive", "cheap") with appropriate options
-- When lacking inventory information, focus on general recommendations and invite store visits
-- Look for opportunities to suggest viewing available vehicles in person
-
-3. Customer Interaction
-- Match the customer's communication style while staying professional
-- Handle non-serious queries (like jokes) with brief, friendly responses before steering back to sales
-- For unclear requests, provide one quick clarification question followed by a suggestion
-- When faced with rudeness, respond once professionally then wait for serious queries
-- When customer shows interest in test drives, guide them to click Appointment link: 
-
-4. Information Hierarchy
-- Price -> Features -> Technical details
-- Always mention price ranges with vehicle suggestions
-- 
-- Keep technical explanations simple unless specifically asked for details
-- Focus on practical benefits over technical specifications
-
-5. Closing Techniques
-- End each response with a subtle call to action
-- When suggesting test drives, specifically mention the "Appointment" link : "https://www.example.com" for easy scheduling
-- Suggest store visits or test drives when interest is shown
-- Provide clear next steps for interested customers
-- Be direct about availability and options
-
-INTERNAL DIALOGUE GUIDELINES:
-
-Before each response, think through:
-1. Customer Profile
-- What is their apparent budget level?
-- What style of communication are they using?
-- What signals are they giving about their interests?
-- What potential objections might they have?
-
-2. Product Selection
-- Which vehicles in our inventory match their needs?
-- What are the key selling points for these options?
-- What alternatives should we have ready?
-- How do our options align with their budget?
-
-3. Sales Approach
-- What tone should I use in my response?
-- How can I move this conversation toward a sale?
-- What would be the most effective call to action?
-- How can I overcome potential objections?
-
-Response Templates:
-- For jokes/non-serious queries: Brief acknowledgment + one vehicle suggestion
-- For rude comments: Make a joke and then steer the conversation to sales
-- For specific vehicle interests: Price range + key features + next step
-- For general queries: 2-3 options with price ranges + simple comparison
-- For test drive inquiries: Mention the "https://www.example.com" link convenience (e.g., "Feel free to click the Appointment website above to schedule your test drive!")
-
-When suggesting vehicles, use this format:
-Brand Model Name Price Range Key Benefit Available Action
-
-[CRITICAL RULE: Only recommend vehicles that exist in the provided csv file.]
-
-Please base your recommendations on the following vehicle data:
-"""
-        
-        return base_prompt + relevant_cars
+        return SALES_INSTRUCTIONS + INVENTORY_HEADER + relevant_cars
     
     def create_reference_prompt(self, car_info: str) -> str:
         """Create system prompt for reference queries"""
-        return """You are Hennyi, an experienced car salesperson. When discussing a specific car that was previously mentioned:
-        1. Be consistent with the details you provided before
-        2. Focus on this specific car's features and benefits
-        3. Encourage test drive scheduling with link : "https://www.example.com"
-        4. Maintain continuous context
-        5. If you realize any previous information was incorrect, acknowledge it professionally
-        
-        Current vehicle information:
-        """ + car_info
-    
-    def get_completion(self, user_query: str) -> str:
-        """Get AI response for user query"""
+        return REFERENCE_INSTRUCTIONS + REFERENCE_HEADER + car_info
+    
+    def _build_messages(self, user_query: str, relevant_cars: str,
+                        session: ChatSession) -> List[Dict[str, str]]:
+        """Assemble the chat messages for a query and its retrieved cars within the token budget"""
+        is_ref, _ = self.is_reference_query(user_query)
+        with session.lock:
+            history = list(session.conversation_history)
+        return self.prompt_builder.build(user_query, relevant_cars, history, reference=is_ref)
+    
+    def _lookup_response(self, user_query: str, relevant_cars: str) -> Tuple[Optional[str], Optional[tuple]]:
+        """Return a cached reply for the query, if any, and the key to store a fresh one under"""
+        if self.response_cache is None or relevant_cars in (NO_CAR_DATA, RETRIEVAL_ERROR):
+            return None, None
+        is_ref, _ = self.is_reference_query(user_query)
+        context = ("reference" if is_ref else "system", relevant_cars)
+        vector = self._query_vector(user_query)
+        cached = self.response_cache.get(context, vector)
+        if cached is not None:
+            logger.debug("Answering from the response cache")
+        self.metrics.count("response_cache_hits" if cached is not None else "response_cache_misses")
+        return cached, (context, vector)
+    
+    def _store_response(self, cache_key: Optional[tuple], ai_response: str) -> None:
+        """Remember a freshly generated reply in the response cache"""
+        if cache_key is not None and ai_response:
+            self.response_cache.put(*cache_key, ai_response)
+    
+    def _record_turn(self, user_query: str, ai_response: str, session: ChatSession) -> None:
+        """Append a finished exchange to the conversation history"""
+        with session.lock:
+            session.conversation_history.append({"role": "user", "content": user_query})
+            session.conversation_history.append({"role": "assistant", "content": ai_response})
+    
+    def _count_tokens(self, messages: List[Dict[str, str]], ai_response: str, usage=None) -> None:
+        """Record prompt and completion token counts on the current trace"""
+        if not self.metrics.active():
+            return
+        if usage is not None:
+            self.metrics.count("prompt_tokens", usage.prompt_tokens)
+            self.metrics.count("completion_tokens", usage.completion_tokens)
+            return
+        self.metrics.count("prompt_tokens", self.prompt_builder.count_messages(messages))
+        self.metrics.count("completion_tokens", self.prompt_builder.counter.count(ai_response))
+    
+    def _prepare_turn(self, user_query: str, session: ChatSession, relevant_cars: Optional[str]) -> PreparedTurn:
+        """Retrieve cars, check the response cache and assemble the prompt for a query
+        
+        Shared by every completion method; a turn answered from the cache
+        carries the cached reply and no messages. The session is left
+        untouched, so a reply cancelled before _finish_turn leaves no trace.
+        """
+        picks = None
+        if relevant_cars is None:
+            with self.metrics.stage("retrieval"):
+                relevant_cars, picks = self._search(user_query, 0.2, self.inventory, session.last_recommendations)
+        with self.metrics.stage("response_cache"):
+            cached, cache_key = self._lookup_response(user_query, relevant_cars)
+        if cached is not None:
+            return PreparedTurn(user_query, session, cached=cached, picks=picks)
+        with self.metrics.stage("prompt"):
+            messages = self._build_messages(user_query, relevant_cars, session)
+        return PreparedTurn(user_query, session, cache_key=cache_key, messages=messages, picks=picks)
+    
+    def _finish_turn(self, turn: PreparedTurn, ai_response: str, usage=None) -> None:
+        """Count tokens, cache a fresh reply and add the exchange and its cars to the session"""
+        if turn.cached is None:
+            self._count_tokens(turn.messages, ai_response, usage)
+            self._store_response(turn.cache_key, ai_response)
+        if turn.picks is not None:
+            turn.session.last_recommendations = turn.picks
+        self._record_turn(turn.user_query, ai_response, turn.session)
+    
+    def _completion_args(self, messages: List[Dict[str, str]], **options) -> Dict[str, Any]:
+        return dict(
+            model=self.config.OPENAI_MODEL,
+            messages=messages,
+            max_tokens=self.config.MAX_TOKENS,
+            temperature=self.config.TEMPERATURE,
+            **options
+        )
+    
+    @staticmethod
+    def _delta(chunk) -> Optional[str]:
+        return chunk.choices[0].delta.content if chunk.choices else None
+    
+    def get_completion(self, user_query: str, session: Optional[ChatSession] = None,
+                       relevant_cars: Optional[str] = None) -> str:
+        """Get AI response for user query
+        
+        relevant_cars, if given, is the retrieval result for the query
+        obtained beforehand (see SpeculativeRetriever) and is used as is.
+        """
+        with self.metrics.trace("completion"):
+            return self._get_completion(user_query, session or self.default_session, relevant_cars)
+    
+    def _get_completion(self, user_query: str, session: ChatSession, relevant_cars: Optional[str]) -> str:
         try:
-            relevant_cars = self.get_relevant_cars(user_query)
-            
-            is_ref, _ = self.is_reference_query(user_query)
+            turn = self._prepare_turn(user_query, session, relevant_cars)
+            if turn.cached is not None:
+                self._finish_turn(turn, turn.cached)
+                return turn.cached
             
-            messages = [
-                {
-                    "role": "system",
-                    "content": self.create_reference_prompt(relevant_cars) if is_ref 
-                              else self.create_system_prompt(relevant_cars)
-                }
-            ]
+            with self.metrics.stage("llm"):
+                completion = self.client.chat.completions.create(**self._completion_args(turn.messages))
             
-            if self.conversation_history:
-                history_start = max(0, len(self.conversation_history) - 
-                                 (self.config.MAX_HISTORY_TURNS * 2))
-                messages.extend(self.conversation_history[history_start:])
+            ai_response = completion.choices[0].message.content
+            self._finish_turn(turn, ai_response, getattr(completion, "usage", None))
+            return ai_response
             
-            messages.append({"role": "user", "content": user_query})
+        except Exception as e:
+            logger.error(f"Error in get_completion: {str(e)}")
+            return FALLBACK_REPLY
+    
+    async def get_completion_async(self, user_query: str, session: Optional[ChatSession] = None,
+                                   relevant_cars: Optional[str] = None) -> str:
+        """Get AI response for user query without blocking the event loop
+        
+        Retrieval runs in a worker thread and the OpenAI call uses the async
+        client. If the awaiting task is cancelled, the turn is not added to
+        the conversation history.
+        """
+        with self.metrics.trace("completion"):
+            return await self._get_completion_async(user_query, session or self.default_session, relevant_cars)
+    
+    async def _get_completion_async(self, user_query: str, session: ChatSession,
+                                    relevant_cars: Optional[str]) -> str:
+        try:
+            turn = await asyncio.to_thread(self._prepare_turn, user_query, session, relevant_cars)
+            if turn.cached is not None:
+                self._finish_turn(turn, turn.cached)
+                return turn.cached
             
-            completion = self.client.chat.completions.create(
-                model=self.config.OPENAI_MODEL,
-                messages=messages,
-                max_tokens=self.config.MAX_TOKENS,
-                temperature=self.config.TEMPERATURE
-            )
+            with self.metrics.stage("llm"):
+                completion = await self.async_client.chat.completions.create(**self._completion_args(turn.messages))
             
             ai_response = completion.choices[0].message.content
-            self.conversation_history.append({"role": "user", "content": user_query})
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
-            
+            self._finish_turn(turn, ai_response, getattr(completion, "usage", None))
             return ai_response
             
         except Exception as e:
-            logger.error(f"Error in get_completion: {str(e)}")
-            return "I apologize, but I'm having trouble processing your request. Please try again."
+            logger.error(f"Error in get_completion_async: {str(e)}")
+            return FALLBACK_REPLY
+    
+    def get_completion_stream(self, user_query: str, session: Optional[ChatSession] = None,
+                              relevant_cars: Optional[str] = None) -> Iterator[str]:
+        """Yield the AI response for user query as text deltas arrive"""
+        # The trace is only made current around each step, never across a
+        # yield, so work the caller does between deltas is not counted in it
+        trace = self.metrics.start("stream")
+        try:
+            yield from self._get_completion_stream(user_query, session or self.default_session,
+                                                   relevant_cars, trace)
+        finally:
+            self.metrics.finish(trace)
     
-    def clear_conversation(self) -> None:
+    def _get_completion_stream(self, user_query: str, session: ChatSession,
+                               relevant_cars: Optional[str], trace: Optional[QueryTrace]) -> Iterator[str]:
+        try:
+            with self.metrics.activate(trace):
+                turn = self._prepare_turn(user_query, session, relevant_cars)
+            if turn.cached is not None:
+                yield turn.cached
+                self._finish_turn(turn, turn.cached)
+                return
+            
+            with self.metrics.activate(trace):
+                started = time.perf_counter()
+                stream = self.client.chat.completions.create(**self._completion_args(turn.messages, stream=True))
+            parts = []
+            for chunk in stream:
+                delta = self._delta(chunk)
+                if delta:
+                    if not parts:
+                        with self.metrics.activate(trace):
+                            self.metrics.record("llm_first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield delta
+            
+            with self.metrics.activate(trace):
+                self.metrics.record("llm", time.perf_counter() - started)
+                self._finish_turn(turn, "".join(parts))
+            
+        except Exception as e:
+            logger.error(f"Error in get_completion_stream: {str(e)}")
+            yield FALLBACK_REPLY
+    
+    async def get_completion_stream_async(self, user_query: str, session: Optional[ChatSession] = None,
+                                          relevant_cars: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the AI response for user query as text deltas arrive, without blocking
+        
+        The turn is only added to the conversation history once the stream
+        has finished, so a reply abandoned halfway leaves no partial answer.
+        """
+        trace = self.metrics.start("stream")
+        try:
+            async for delta in self._get_completion_stream_async(user_query, session or self.default_session,
+                                                                 relevant_cars, trace):
+                yield delta
+        finally:
+            self.metrics.finish(trace)
+    
+    async def _get_completion_stream_async(self, user_query: str, session: ChatSession, relevant_cars: Optional[str],
+                                           trace: Optional[QueryTrace]) -> AsyncIterator[str]:
+        try:
+            with self.metrics.activate(trace):
+                # to_thread copies the context, so the worker sees the trace too
+                turn = await asyncio.to_thread(self._prepare_turn, user_query, session, relevant_cars)
+            if turn.cached is not None:
+                yield turn.cached
+                self._finish_turn(turn, turn.cached)
+                return
+            
+            with self.metrics.activate(trace):
+                started = time.perf_counter()
+                stream = await self.async_client.chat.completions.create(
+                    **self._completion_args(turn.messages, stream=True)
+                )
+            parts = []
+            async for chunk in stream:
+                delta = self._delta(chunk)
+                if delta:
+                    if not parts:
+                        with self.metrics.activate(trace):
+                            self.metrics.record("llm_first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield delta
+            
+            with self.metrics.activate(trace):
+                self.metrics.record("llm", time.perf_counter() - started)
+                self._finish_turn(turn, "".join(parts))
+            
+        except Exception as e:
+            logger.error(f"Error in get_completion_stream_async: {str(e)}")
+            yield FALLBACK_REPLY
+    
+    def metrics_text(self) -> str:
+        """Stage timings, token counts and cache statistics in the Prometheus text format"""
+        lines = [self.metrics.render_prometheus().rstrip("\n")]
+        caches = [("query", self.query_cache)]
+        if self.response_cache is not None:
+            caches.append(("response", self.response_cache))
+        lines.append("# TYPE assistant_cache_lookups_total counter")
+        for name, cache in caches:
+            stats = cache.stats()
+            lines.append(f'assistant_cache_lookups_total{{cache="{name}",result="hit"}} {stats["hits"]}')
+            lines.append(f'assistant_cache_lookups_total{{cache="{name}",result="miss"}} {stats["misses"]}')
+        lines.append("# TYPE assistant_cache_entries gauge")
+        for name, cache in caches:
+            lines.append(f'assistant_cache_entries{{cache="{name}"}} {len(cache)}')
+        inventory = self.inventory
+        lines.append("# TYPE assistant_inventory_cars gauge")
+        lines.append(f"assistant_inventory_cars {len(inventory) if inventory is not None else 0}")
+        return "\n".join(lines) + "\n"
+    
+    def clear_conversation(self, session: Optional[ChatSession] = None) -> None:
         """Clear conversation history"""
-        self.conversation_history = []
+        (session or self.default_session).clear_history()
         logger.info("Conversation history cleared")
 
-def setup_assistant():
+def setup_assistant(progress: Optional[Callable[[str], None]] = None,
+                    config_path: str = "data/config.json"):
     """Main execution function"""
+    progress = progress or (lambda stage: None)
     # Set your OpenAI API key here
-    system_config = json.load(open("data/config.json", "r", encoding="utf-8"))
+    system_config = json.load(open(config_path, "r", encoding="utf-8"))
     api_key = system_config["api_key"]
     os.environ['OPENAI_API_KEY'] = api_key
-    config = Config()
+    config = Config(OPENAI_BASE_URL=system_config.get("openai_base_url"))
     assistant = CarSalesAssistant(config, api_key)
     
-    csv_path = system_config["csv_path"]  # Replace with your CSV path
-    assistant.load_car_data(csv_path)
+    progress("Loading language model")
+    assistant.model
+    
+    # Prefer a prebuilt artifact from python -m src.core.build_index, so the
+    # inventory is never encoded at startup
+    index_path = system_config.get("index_path")
+    if index_path:
+        progress("Opening inventory index")
+        assistant.load_index(index_path)
+    else:
+        progress("Loading inventory")
+        csv_path = system_config["csv_path"]  # Replace with your CSV path
+        assistant.load_car_data(csv_path)
     
     return assistant
     
@@ -0,0 +1,130 @@
+"""Build a versioned index artifact from an inventory CSV, offline
+
+    python -m src.core.build_index --csv data/cars.csv --out data/index
+
+Then set "index_path": "data/index" in data/config.json and the app opens
+the newest version memory-mapped instead of encoding the inventory itself.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+from .assistant import Config, build_search_index
+from .embedding_cache import EmbeddingCache
+from .index_artifact import publish_version
+from .inventory import Inventory, build_car_table, filter_columns, validate_inventory
+from .quantization import STORAGE_TYPES
+from .vector_index import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_documents(model_name: str, documents: List[str], batch_size: int = 256,
+                     threads: int = 0, processes: int = 1) -> np.ndarray:
+    """Encode documents in batches, using every core by default
+
+    threads sets torch's intra-op thread count (0 keeps one per core);
+    processes > 1 spreads batches over a sentence-transformers process pool.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(model_name)
+
+    if processes > 1:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            return np.asarray(model.encode_multi_process(documents, pool, batch_size=batch_size), dtype=np.float32)
+        finally:
+            model.stop_multi_process_pool(pool)
+
+    embeddings = np.empty((len(documents), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    step = batch_size * 16
+    for start in range(0, len(documents), step):
+        embeddings[start:start + step] = model.encode(documents[start:start + step], batch_size=batch_size)
+        logger.info(f"Encoded {min(start + step, len(documents))}/{len(documents)} documents")
+    return embeddings
+
+
+def build(csv_path: str, out_dir: str, config: Optional[Config] = None, batch_size: int = 256,
+          threads: int = 0, processes: int = 1, keep: int = 3) -> str:
+    """Format, embed and index an inventory CSV and publish it as a new artifact version"""
+    config = config or Config()
+    started = time.perf_counter()
+
+    df, report = validate_inventory(pd.read_csv(csv_path))
+    logger.info(f"Formatted {csv_path}: {report}")
+    if df.empty:
+        raise ValueError(f"{csv_path} has no valid cars")
+    table, documents = build_car_table(df)
+
+    # Reuse vectors of unchanged cars from the embedding cache when there is one
+    cache = EmbeddingCache(config.EMBEDDING_CACHE_PATH, config.MODEL_NAME) if config.EMBEDDING_CACHE_PATH else None
+    keys = [cache.key(doc) for doc in documents] if cache is not None else []
+    embeddings, missing = cache.lookup(keys) if cache is not None else (None, list(range(len(documents))))
+    logger.info(f"Encoding {len(missing)} of {len(documents)} documents")
+    if missing:
+        fresh = encode_documents(config.MODEL_NAME, [documents[i] for i in missing], batch_size, threads, processes)
+        if embeddings is None:
+            embeddings = fresh
+        else:
+            embeddings[missing] = fresh
+        if cache is not None:
+            cache.put([keys[i] for i in missing], fresh)
+    if cache is not None:
+        cache.save(retain=keys)
+
+    embeddings = normalize_rows(embeddings)
+    inventory = Inventory(
+        table, embeddings, df["VIN"].tolist(), build_search_index(embeddings, config), filter_columns(df)
+    )
+    path = publish_version(out_dir, inventory, config.MODEL_NAME, {
+        "source_csv": os.path.abspath(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "vector_index": config.VECTOR_INDEX,
+        "embedding_storage": config.EMBEDDING_STORAGE,
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }, keep=keep)
+    logger.info(f"Published {len(inventory)} cars to {path} in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a versioned inventory index artifact")
+    parser.add_argument("--csv", help="inventory CSV (default: csv_path from data/config.json)")
+    parser.add_argument("--out", default="data/index", help="artifact root directory")
+    parser.add_argument("--config", default="data/config.json", help="app config to read csv_path from")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 for one per core")
+    parser.add_argument("--processes", type=int, default=1, help="encoder processes")
+    parser.add_argument("--index", choices=["exact", "ivf"], default=Config.VECTOR_INDEX)
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default=Config.EMBEDDING_STORAGE)
+    parser.add_argument("--keep", type=int, default=3, help="versions to keep, including the new one")
+    args = parser.parse_args(argv)
+
+    csv_path = args.csv
+    if not csv_path:
+        with open(args.config, "r", encoding="utf-8") as f:
+            csv_path = json.load(f)["csv_path"]
+
+    config = Config(VECTOR_INDEX=args.index, EMBEDDING_STORAGE=args.storage)
+    build(csv_path, args.out, config, args.batch_size, args.threads, args.processes, args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with optional time-to-live and hit/miss counters"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, stored_at = item
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = (value, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """Thread-safe semantic cache of LLM replies.
+
+    A reply is reused for a new query when it was generated for exactly the
+    same context (prompt mode and retrieved cars) and the two queries'
+    normalized embeddings have a cosine similarity of at least threshold.
+    Entries are evicted least recently used first and expire after ttl
+    seconds (0 never).
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0, threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        # entry id -> (context, query vector, reply, stored_at), in LRU order
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._by_context: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, entry_id: int) -> None:
+        context = self._entries.pop(entry_id)[0]
+        ids = self._by_context[context]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_context[context]
+
+    def get(self, context: Hashable, vector: np.ndarray) -> Optional[str]:
+        """Return the reply cached for the most similar query in context, if close enough"""
+        with self._lock:
+            now = time.monotonic()
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._by_context.get(context, ())):
+                _, cached_vector, _, stored_at = self._entries[entry_id]
+                if self.ttl and now - stored_at >= self.ttl:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(cached_vector, vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def put(self, context: Hashable, vector: np.ndarray, reply: str) -> None:
+        """Store a reply, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (context, vector, reply, time.monotonic())
+            self._by_context.setdefault(context, []).append(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
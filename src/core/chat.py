@@ -1,12 +1,133 @@
-from .assistant import setup_assistant
+import asyncio
+import logging
+import threading
+
+from .session import ChatSession
+from .speculative import SpeculativeRetriever
 from .stt import real_time_speech_to_text
 
-assistant = setup_assistant()
+logger = logging.getLogger(__name__)
+
+# One engine (model, inventory, index) shared by every chat session. It is
+# built on a background thread by warm_up(), so importing this module stays
+# cheap and the window can open before torch, pandas and the inventory load.
+_engine = {"assistant": None, "stage": "Starting up", "error": None, "thread": None}
+_ready = threading.Event()
+_engine_lock = threading.Lock()
+_progress_listeners = []
+
+def _report(stage, finished=False):
+    with _engine_lock:
+        _engine["stage"] = stage
+        listeners = list(_progress_listeners)
+        if finished:
+            # Warm-up is over, ready or failed; nothing more will be reported
+            _ready.set()
+            _progress_listeners.clear()
+    for listener in listeners:
+        try:
+            listener(stage, finished)
+        except Exception as e:
+            logger.warning(f"Progress listener failed: {str(e)}")
+
+def _build_engine():
+    try:
+        # Heavy imports happen here, off the UI thread
+        from .assistant import setup_assistant
+        _engine["assistant"] = setup_assistant(progress=_report)
+        _report("Ready", finished=True)
+    except Exception as e:
+        logger.error(f"Failed to start assistant: {str(e)}")
+        _engine["error"] = e
+        _report(f"Failed to start: {e}", finished=True)
+
+def warm_up(on_progress=None):
+    """Start building the engine in the background; safe to call repeatedly
+
+    on_progress(stage, finished) is called with the current stage right away
+    and again whenever it changes, until warm-up has finished (check
+    is_ready() to tell success from failure). Listeners are dropped once it
+    has, or earlier with remove_progress_listener().
+    """
+    with _engine_lock:
+        if on_progress is not None and not _ready.is_set():
+            _progress_listeners.append(on_progress)
+        if _engine["thread"] is None:
+            _engine["thread"] = threading.Thread(target=_build_engine, name="assistant-warmup", daemon=True)
+            _engine["thread"].start()
+        stage, finished = _engine["stage"], _ready.is_set()
+    if on_progress is not None:
+        on_progress(stage, finished)
+
+def remove_progress_listener(on_progress):
+    """Stop reporting warm-up progress to a listener, e.g. when its page closes"""
+    with _engine_lock:
+        if on_progress in _progress_listeners:
+            _progress_listeners.remove(on_progress)
+
+def is_ready():
+    return _ready.is_set() and _engine["error"] is None
 
-def get_bot_response(user_message=None):
+def get_assistant(timeout=None):
+    """Return the engine, waiting for warm-up to finish"""
+    warm_up()
+    if not _ready.wait(timeout):
+        raise TimeoutError("Assistant is still warming up")
+    if _engine["error"] is not None:
+        raise RuntimeError("Assistant failed to start") from _engine["error"]
+    return _engine["assistant"]
+
+async def get_assistant_async():
+    # Messages sent during warm-up wait here until the engine is ready
+    if not _ready.is_set():
+        warm_up()
+        await asyncio.to_thread(_ready.wait)
+    return get_assistant()
+
+def new_session():
+    return ChatSession()
+
+def get_bot_response(user_message=None, session=None):
     if user_message is None:
         user_message = real_time_speech_to_text()
+        if not user_message:
+            # Nothing was heard before the listen timeout
+            return None, None
         
-    response = assistant.get_completion(user_message)
+    response = get_assistant().get_completion(user_message, session=session)
     
-    return user_message, response
\ No newline at end of file
+    return user_message, response
+
+async def listen_async(timeout=20.0, on_partial=None):
+    # The microphone blocks, so listen in a worker thread; cancelling the
+    # task stops the worker too instead of leaving it waiting for speech
+    cancel = threading.Event()
+    try:
+        return await asyncio.to_thread(real_time_speech_to_text, timeout, cancel, on_partial)
+    finally:
+        cancel.set()
+
+async def listen_and_retrieve(session=None, timeout=20.0):
+    """Listen for a voice query, retrieving cars for it while the user speaks
+
+    Returns the transcript and its relevant cars, or (None, None) if nothing
+    was heard. Speculation needs the engine, so during warm-up the cars are
+    None and are looked up with the reply as usual.
+    """
+    retriever = SpeculativeRetriever(get_assistant(), session) if is_ready() else None
+    try:
+        user_message = await listen_async(timeout, retriever.update if retriever is not None else None)
+        if not user_message:
+            return None, None
+        if retriever is None:
+            return user_message, None
+        return user_message, await asyncio.to_thread(retriever.finish, user_message)
+    finally:
+        if retriever is not None:
+            retriever.close()
+
+async def stream_bot_response(user_message, session=None, relevant_cars=None):
+    assistant = await get_assistant_async()
+    async for delta in assistant.get_completion_stream_async(user_message, session=session,
+                                                             relevant_cars=relevant_cars):
+        yield delta
@@ -0,0 +1,118 @@
+import os
+import hashlib
+import logging
+import tempfile
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk store of document embeddings.
+
+    Entries are keyed by a SHA-256 of the embedding model name and the
+    formatted document, so a row only has to go through the encoder again
+    when its text (or the model) changes.
+    """
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self._index: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def key(self, document: str) -> str:
+        """Return the cache key for a formatted document"""
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(document.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _load(self) -> None:
+        """Read the cache file, ignoring it if it was built for another model"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model_name"]) != self.model_name:
+                    logger.info(f"Ignoring embedding cache built with {data['model_name']}")
+                    self._dirty = True
+                    return
+                keys = data["keys"]
+                self._vectors = np.ascontiguousarray(data["vectors"], dtype=np.float32)
+            self._index = {key.decode("ascii"): i for i, key in enumerate(keys)}
+            logger.info(f"Loaded {len(self._index)} cached embeddings from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not read embedding cache {self.path}: {str(e)}")
+            self._index = {}
+            self._vectors = None
+            self._dirty = True
+
+    def lookup(self, keys: Sequence[str]) -> Tuple[Optional[np.ndarray], List[int]]:
+        """Return cached vectors for keys and the positions that were not found.
+
+        The returned matrix has one row per key; rows at missing positions are
+        left zeroed for the caller to fill in. It is None when nothing was
+        found, since the embedding width is not known yet.
+        """
+        rows = np.fromiter((self._index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        hits = rows >= 0
+        missing = np.flatnonzero(~hits).tolist()
+        if self._vectors is None or not hits.any():
+            return None, missing
+        vectors = np.zeros((len(keys), self._vectors.shape[1]), dtype=np.float32)
+        vectors[hits] = self._vectors[rows[hits]]
+        return vectors, missing
+
+    def put(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Add freshly encoded vectors to the cache"""
+        new_keys, new_rows, seen = [], [], set()
+        for i, key in enumerate(keys):
+            if key not in self._index and key not in seen:
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+        if not new_keys:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)[new_rows]
+        start = 0 if self._vectors is None else len(self._vectors)
+        self._vectors = vectors if self._vectors is None else np.concatenate([self._vectors, vectors])
+        self._index.update((key, start + i) for i, key in enumerate(new_keys))
+        self._dirty = True
+
+    def save(self, retain: Optional[Sequence[str]] = None) -> None:
+        """Write the cache back to disk, keeping only retained keys if given"""
+        if retain is not None:
+            keep = {key: self._index[key] for key in dict.fromkeys(retain) if key in self._index}
+            if len(keep) != len(self._index):
+                rows = np.fromiter(keep.values(), dtype=np.int64, count=len(keep))
+                self._vectors = self._vectors[rows] if self._vectors is not None else None
+                self._index = {key: i for i, key in enumerate(keep)}
+                self._dirty = True
+        if not self._dirty:
+            return
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        keys = np.array(list(self._index), dtype="S64")
+        vectors = self._vectors if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+
+        # Write to a temporary file first so a crash never leaves a torn cache
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, model_name=np.array(self.model_name), keys=keys, vectors=vectors)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._dirty = False
+        logger.info(f"Saved {len(self._index)} embeddings to {self.path}")
@@ -0,0 +1,170 @@
+import re
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, fields
+
+# Keyword -> (substrings a Fuel_Type must contain, substrings it must not contain)
+FUEL_KEYWORDS: Dict[str, Tuple[List[str], List[str]]] = {
+    "electric": (["electric"], ["hybrid", "gas"]),
+    "hybrid": (["hybrid"], []),
+    "diesel": (["diesel"], []),
+    "gasoline": (["gas", "petrol", "unleaded"], ["hybrid", "electric"]),
+}
+
+FUEL_PATTERNS: List[Tuple[str, str]] = [
+    (r"\b(?:ev|evs|electric|battery[- ]powered)\b", "electric"),
+    (r"\b(?:hybrid|hybrids|plug-in)\b", "hybrid"),
+    (r"\bdiesel\b", "diesel"),
+    # "Gas" alone is usually about fuel economy ("better on gas"), so only
+    # fuel-type phrasing such as "gas car" or "gasoline engine" counts
+    (r"\b(?:gas|gasoline|petrol)(?:[- ]powered\b|\s+(?:only|engines?|cars?|vehicles?|models?|suvs?|trucks?"
+     r"|sedans?|versions?)\b)", "gasoline"),
+]
+
+# Drivetrain keyword -> substrings that identify it in the Drivetrain column
+DRIVETRAIN_PATTERNS: List[Tuple[str, List[str]]] = [
+    (r"\b(?:awd|all[- ]wheel(?: drive)?)\b", ["awd", "all wheel", "all-wheel"]),
+    (r"\b(?:4wd|4x4|four[- ]wheel(?: drive)?)\b", ["4wd", "4x4", "four wheel", "four-wheel"]),
+    (r"\b(?:fwd|front[- ]wheel(?: drive)?)\b", ["fwd", "front wheel", "front-wheel"]),
+    (r"\b(?:rwd|rear[- ]wheel(?: drive)?)\b", ["rwd", "rear wheel", "rear-wheel"]),
+]
+
+_MONEY = r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(?:(k|grand|thousand)\b)?"
+_UPPER = r"(?:under|below|less than|up to|at most|max(?:imum)?|no more than|cheaper than|within|budget(?: of| is)?|<)"
+_LOWER = r"(?:over|above|more than|at least|min(?:imum)?|starting at|>)"
+# Odometer limits; "within 10 miles" and "10 miles away" are distances
+_MILES_UPPER = r"(?:under|below|less than|up to|at most|max(?:imum)?|no more than|<)"
+_MILES = r"(\d[\d,]*)\s*(k)?\s*(?:miles|mi\b)(?!\s*(?:away|from|of)\b)"
+# Units that make a bare number a seat count ("7 seats", "a 2-seater")
+SEATING_UNITS = r"(?:seats?|seater|passengers?|people)"
+
+# A fuel or drivetrain mention is dropped when one of these comes shortly
+# before it in the same clause ("I don't want an EV", "anything but a hybrid")
+_NEGATION = re.compile(r"\b(?:no|not|don't|dont|do not|without|anything but|except|other than|avoid)\b")
+_NEGATION_WINDOW = 4  # words before the mention that are checked
+
+
+@dataclass
+class QueryConstraints:
+    """Hard constraints a customer stated in a query"""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    max_miles: Optional[float] = None
+    min_passengers: Optional[int] = None
+    fuel_types: List[str] = field(default_factory=list)
+    drivetrains: List[List[str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, f.name) for f in fields(self))
+
+    def mask(self, columns: Dict[str, object]) -> np.ndarray:
+        """Return a boolean mask of inventory rows that satisfy every constraint
+
+        Rows with a missing value fail any constraint on that column, and a
+        $0 price (special pricing) counts as missing.
+        """
+        price = columns["SellingPrice"]
+        mask = np.ones(len(price), dtype=bool)
+        known_price = price > 0
+        with np.errstate(invalid="ignore"):
+            if self.min_price is not None:
+                mask &= known_price & (price >= self.min_price)
+            if self.max_price is not None:
+                mask &= known_price & (price <= self.max_price)
+            if self.min_year is not None:
+                mask &= columns["Year"] >= self.min_year
+            if self.max_year is not None:
+                mask &= columns["Year"] <= self.max_year
+            if self.max_miles is not None:
+                mask &= columns["Miles"] <= self.max_miles
+            if self.min_passengers is not None:
+                mask &= columns["PassengerCapacity"] >= self.min_passengers
+        if self.fuel_types:
+            fuel_mask = np.zeros_like(mask)
+            for fuel in self.fuel_types:
+                include, exclude = FUEL_KEYWORDS[fuel]
+                fuel_mask |= columns["Fuel_Type"].matches(include, exclude)
+            mask &= fuel_mask
+        if self.drivetrains:
+            drive_mask = np.zeros_like(mask)
+            for include in self.drivetrains:
+                drive_mask |= columns["Drivetrain"].matches(include)
+            mask &= drive_mask
+        return mask
+
+
+def _parse_money(amount: str, unit: Optional[str]) -> float:
+    value = float(amount.replace(",", ""))
+    return value * 1000 if unit else value
+
+
+def _looks_like_price(match: re.Match, text: str) -> bool:
+    """Tell a price from a bare number by its $, k suffix or size"""
+    raw = match.group(0)
+    following = text[match.end():match.end() + 12]
+    if re.match(r"\s*(?:miles|mi\b|km|kilomet)", following):
+        return False
+    return "$" in raw or bool(match.group(2)) or float(match.group(1).replace(",", "")) >= 1000
+
+
+def _negated(text: str, start: int) -> bool:
+    """Whether a negation precedes position start within a few words of the same clause"""
+    clause = re.split(r"[,.;!?]", text[:start])[-1]
+    return bool(_NEGATION.search(" ".join(clause.split()[-_NEGATION_WINDOW:])))
+
+
+def _mentioned(pattern: str, text: str) -> bool:
+    return any(not _negated(text, match.start()) for match in re.finditer(pattern, text))
+
+
+def extract_constraints(query: str) -> QueryConstraints:
+    """Pull price, year, mileage, fuel, drivetrain and seating limits out of a query"""
+    text = query.lower()
+    constraints = QueryConstraints()
+
+    # Mileage first, so "under 50k miles" is not read as a price
+    for match in re.finditer(_MILES_UPPER + r"\s*" + _MILES, text):
+        constraints.max_miles = _parse_money(match.group(1), match.group(2))
+    if re.search(r"\blow (?:mileage|miles)\b", text) and constraints.max_miles is None:
+        constraints.max_miles = 50000
+    text_without_miles = re.sub(r"\d[\d,]*\s*k?\s*(?:miles|mi\b)", " ", text)
+
+    # Year bounds
+    year = r"((?:19|20)\d{2})"
+    for match in re.finditer(year + r"\s*(?:or|and)\s*(?:newer|later|up|above)|" + year + r"\s*\+", text):
+        constraints.min_year = int(match.group(1) or match.group(2))
+    for match in re.finditer(r"(?:newer than|after|since|from)\s*" + year, text):
+        constraints.min_year = int(match.group(1)) + (1 if match.group(0).startswith(("newer", "after")) else 0)
+    for match in re.finditer(year + r"\s*(?:or|and)\s*(?:older|earlier|below)", text):
+        constraints.max_year = int(match.group(1))
+    for match in re.finditer(r"(?:older than|before)\s*" + year, text):
+        constraints.max_year = int(match.group(1)) - 1
+    text_without_years = re.sub(r"(?<![\d$,])(?:19|20)\d{2}(?![\d,k])", " ", text_without_miles)
+
+    # Price ranges and bounds
+    range_match = re.search(r"(?:between\s*)?" + _MONEY + r"\s*(?:-|to|and)\s*" + _MONEY, text_without_years)
+    if range_match and (_looks_like_price(range_match, text_without_years) or range_match.group(4)):
+        low = _parse_money(range_match.group(1), range_match.group(2) or range_match.group(4))
+        high = _parse_money(range_match.group(3), range_match.group(4))
+        if low < high:
+            constraints.min_price, constraints.max_price = low, high
+    if constraints.max_price is None:
+        for match in re.finditer(_UPPER + r"\s*" + _MONEY, text_without_years):
+            if _looks_like_price(match, text_without_years):
+                constraints.max_price = _parse_money(match.group(1), match.group(2))
+        for match in re.finditer(_LOWER + r"\s*" + _MONEY, text_without_years):
+            if _looks_like_price(match, text_without_years):
+                constraints.min_price = _parse_money(match.group(1), match.group(2))
+
+    # Seating
+    seats = re.search(r"(\d)\s*(?:-|\s)?\s*" + SEATING_UNITS + r"\b|seats?\s*(\d)\b", text)
+    if seats:
+        constraints.min_passengers = int(seats.group(1) or seats.group(2))
+    elif re.search(r"\b(?:third|3rd)[- ]row\b", text):
+        constraints.min_passengers = 7
+
+    constraints.fuel_types = [fuel for pattern, fuel in FUEL_PATTERNS if _mentioned(pattern, text)]
+    constraints.drivetrains = [include for pattern, include in DRIVETRAIN_PATTERNS if _mentioned(pattern, text)]
+    return constraints
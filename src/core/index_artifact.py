@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .inventory import CarTable, CategoricalColumn, Inventory, InternedColumn, StringColumn
+from .quantization import QuantizedEmbeddings
+from .vector_index import ExactIndex, IVFIndex, RescoringIndex, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# File in an artifact root naming the version directory to serve
+CURRENT_NAME = "CURRENT"
+
+# An artifact is a directory holding manifest.json plus one .npy file per
+# array. Workers open the arrays with np.load(mmap_mode="r"), so every
+# process on a host shares the same page-cached copy instead of its own.
+
+
+def _save_array(directory: str, name: str, array: np.ndarray) -> str:
+    np.save(os.path.join(directory, name + ".npy"), np.asarray(array), allow_pickle=False)
+    return name
+
+
+def _load_array(directory: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r", allow_pickle=False)
+
+
+def _load_view(directory: str, name: str) -> np.ndarray:
+    """Memory-mapped array as a plain ndarray view, which is much cheaper to slice row by row"""
+    return _load_array(directory, name).view(np.ndarray)
+
+
+def _save_strings(directory: str, name: str, values: Union[List[str], StringColumn]) -> Dict[str, str]:
+    """Store strings as one UTF-8 buffer plus offsets"""
+    column = values if isinstance(values, StringColumn) else StringColumn(values)
+    return {
+        "data": _save_array(directory, name + ".data", np.frombuffer(column.data, dtype=np.uint8)),
+        "offsets": _save_array(directory, name + ".offsets", column.offsets),
+    }
+
+
+def _load_strings(directory: str, spec: Dict[str, str]) -> StringColumn:
+    return StringColumn.from_buffers(_load_view(directory, spec["data"]), _load_view(directory, spec["offsets"]))
+
+
+def _save_field(directory: str, name: str, column) -> Dict[str, Any]:
+    if isinstance(column, InternedColumn):
+        return {
+            "encoding": "interned",
+            "codes": _save_array(directory, name + ".codes", column.codes),
+            "categories": _save_strings(directory, name + ".categories", column.categories),
+        }
+    return {
+        "encoding": "string",
+        "data": _save_array(directory, name + ".data", np.frombuffer(column.data, dtype=np.uint8)),
+        "offsets": _save_array(directory, name + ".offsets", column.offsets),
+    }
+
+
+def _load_field(directory: str, spec: Dict[str, Any]):
+    if spec["encoding"] == "interned":
+        categories = _load_strings(directory, spec["categories"]).tolist()
+        return InternedColumn.from_codes(_load_view(directory, spec["codes"]), categories)
+    return _load_strings(directory, spec)
+
+
+def _save_filter_columns(directory: str, columns: Dict[str, Any]) -> Dict[str, Any]:
+    specs = {}
+    for name, column in columns.items():
+        if isinstance(column, CategoricalColumn):
+            specs[name] = {
+                "encoding": "categorical",
+                "codes": _save_array(directory, f"filter.{name}.codes", column.codes),
+                "categories": _save_strings(directory, f"filter.{name}.categories", list(column.categories)),
+            }
+        else:
+            specs[name] = {"encoding": "numeric", "values": _save_array(directory, f"filter.{name}", column)}
+    return specs
+
+
+def _load_filter_columns(directory: str, specs: Dict[str, Any]) -> Dict[str, Any]:
+    columns = {}
+    for name, spec in specs.items():
+        if spec["encoding"] == "categorical":
+            categories = _load_strings(directory, spec["categories"]).tolist()
+            columns[name] = CategoricalColumn.from_codes(_load_view(directory, spec["codes"]), categories)
+        else:
+            columns[name] = _load_view(directory, spec["values"])
+    return columns
+
+
+def _save_index(directory: str, index: VectorIndex) -> Dict[str, Any]:
+    if isinstance(index, RescoringIndex):
+        quantized = index.candidate_index.embeddings
+        return {
+            "type": "rescore",
+            "rescore_factor": index.rescore_factor,
+            "storage": quantized.storage,
+            "codes": _save_array(directory, "quantized.codes", quantized.codes),
+            "scales": _save_array(directory, "quantized.scales", quantized.scales),
+            "candidate_index": _save_index(directory, index.candidate_index),
+        }
+    if isinstance(index, IVFIndex):
+        return {
+            "type": "ivf",
+            "n_probe": index.n_probe,
+            "centroids": _save_array(directory, "ivf.centroids", index.centroids),
+            "order": _save_array(directory, "ivf.order", index.order),
+            "offsets": _save_array(directory, "ivf.offsets", index.offsets),
+        }
+    if isinstance(index, ExactIndex):
+        return {"type": "exact"}
+    raise ValueError(f"Cannot save a {type(index).__name__}")
+
+
+def _load_index(directory: str, spec: Dict[str, Any], embeddings, n_probe: Optional[int]) -> VectorIndex:
+    if spec["type"] == "rescore":
+        quantized = QuantizedEmbeddings.from_arrays(
+            _load_array(directory, spec["codes"]), _load_array(directory, spec["scales"])
+        )
+        candidate_index = _load_index(directory, spec["candidate_index"], quantized, n_probe)
+        return RescoringIndex(embeddings, candidate_index, spec["rescore_factor"])
+    if spec["type"] == "ivf":
+        return IVFIndex.from_arrays(
+            embeddings,
+            _load_view(directory, spec["centroids"]),
+            _load_view(directory, spec["order"]),
+            _load_view(directory, spec["offsets"]),
+            n_probe or spec["n_probe"],
+        )
+    if spec["type"] == "exact":
+        return ExactIndex(embeddings)
+    raise ValueError(f"Unknown index type in artifact: {spec['type']}")
+
+
+def save_index(inventory: Inventory, path: str, model_name: str,
+               metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Write an inventory snapshot as a memory-mappable index artifact directory
+
+    The artifact is written next to path first and moved into place, so
+    readers never see a half-written directory. Returns the manifest.
+    """
+    path = os.path.abspath(path)
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        documents = inventory.documents
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model_name": model_name,
+            "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": len(inventory),
+            "dimensions": int(inventory.embeddings.shape[1]),
+            "embeddings": _save_array(staging, "embeddings", inventory.embeddings),
+            "vins": _save_strings(staging, "vins", inventory.vins),
+            "fingerprints": _save_array(staging, "fingerprints", documents.fingerprints),
+            "fields": [_save_field(staging, f"field{i}", column) for i, column in enumerate(documents.columns)],
+            "filter_columns": _save_filter_columns(staging, inventory.columns),
+            "index": _save_index(staging, inventory.index),
+            **(metadata or {}),
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            # Processes that mapped the old files keep reading them until they reload
+            shutil.rmtree(path)
+        os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info(f"Saved index artifact with {manifest['rows']} cars to {path}")
+    return manifest
+
+
+def publish_version(root: str, inventory: Inventory, model_name: str,
+                    metadata: Optional[Dict[str, Any]] = None, keep: int = 3) -> str:
+    """Save a new timestamped version under root, point CURRENT at it and prune old versions
+
+    Returns the path of the new version directory.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = os.path.join(root, version)
+    save_index(inventory, path, model_name, {"version": version, **(metadata or {})})
+
+    pointer = os.path.join(root, f"{CURRENT_NAME}.tmp-{os.getpid()}")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(pointer, os.path.join(root, CURRENT_NAME))
+
+    versions = sorted(
+        name for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, MANIFEST_NAME)) and name != version
+    )
+    for name in versions[:max(0, len(versions) - max(keep, 1) + 1)]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        logger.info(f"Pruned index version {name}")
+    return path
+
+
+def resolve_index_path(path: str) -> str:
+    """Follow an artifact root's CURRENT pointer, or return path if it is a version itself"""
+    pointer = os.path.join(path, CURRENT_NAME)
+    if os.path.isfile(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Read an artifact's manifest without opening its arrays"""
+    with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index artifact version {manifest.get('format_version')} in {path}")
+    return manifest
+
+
+def load_index(path: str, n_probe: Optional[int] = None) -> Tuple[Inventory, Dict[str, Any]]:
+    """Open an index artifact with every array memory-mapped read-only
+
+    path is a version directory or an artifact root with a CURRENT pointer.
+    Returns the inventory snapshot and the artifact's manifest. Only the
+    interned category values are copied into memory, plus the VIN lookup
+    table if the inventory is later synced from a CSV.
+    """
+    path = resolve_index_path(path)
+    manifest = read_manifest(path)
+    embeddings = _load_array(path, manifest["embeddings"])
+    documents = CarTable.from_columns(
+        [_load_field(path, spec) for spec in manifest["fields"]],
+        _load_array(path, manifest["fingerprints"]),
+    )
+    inventory = Inventory(
+        documents,
+        embeddings,
+        _load_strings(path, manifest["vins"]),
+        _load_index(path, manifest["index"], embeddings, n_probe),
+        _load_filter_columns(path, manifest["filter_columns"]),
+    )
+    logger.info(f"Opened index artifact {path}: {manifest['rows']} cars built {manifest['built_at']}")
+    return inventory, manifest
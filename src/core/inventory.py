@@ -0,0 +1,325 @@
+import sys
+import hashlib
+import numpy as np
+import pandas as pd
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, List, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+from functools import cached_property
+from .vector_index import VectorIndex
+
+
+# (label, column, prefix, suffix) for every field of a formatted car document,
+# in the order CarSalesAssistant.format_car_document writes them
+CAR_FIELDS: List[Tuple[str, str, str, str]] = [
+    ("Type", "Type", "", ""),
+    ("Stock", "Stock", "", ""),
+    ("VIN", "VIN", "", ""),
+    ("Year", "Year", "", ""),
+    ("Make", "Make", "", ""),
+    ("Model", "Model", "", ""),
+    ("ModelNumber", "ModelNumber", "", ""),
+    ("Exterior Color", "ExteriorColor", "", ""),
+    ("Interior Color", "InteriorColor", "", ""),
+    ("Transmission", "Transmission", "", ""),
+    ("Mileage", "Miles", "", "mi"),
+    ("Selling Price", "SellingPrice", "$", ""),
+    ("Options", "Options", "", ""),
+    ("Style Description", "Style_Description", "", ""),
+    ("Engine Block Type", "Engine_Block_Type", "", ""),
+    ("Engine Aspiration Type", "Engine_Aspiration_Type", "", ""),
+    ("Engine Description", "Engine_Description", "", ""),
+    ("Transmission Description", "Transmission_Description", "", ""),
+    ("Drivetrain", "Drivetrain", "", ""),
+    ("Fuel Type", "Fuel_Type", "", ""),
+    ("City MPG", "CityMPG", "", "mpg"),
+    ("Highway MPG", "HighwayMPG", "", "mpg"),
+    ("EPA Classification", "EPAClassification", "", ""),
+    ("Wheelbase Code", "Wheelbase_Code", "", ""),
+    ("Market Class", "MarketClass", "", ""),
+    ("Passenger Capacity", "PassengerCapacity", "", ""),
+    ("Engine Displacement", "EngineDisplacementCubicInches", "", ""),
+]
+
+REQUIRED_COLUMNS: List[str] = [column for _, column, _, _ in CAR_FIELDS]
+
+DOCUMENT_TEMPLATE: str = ", ".join(f"{label}: {prefix}%s{suffix}" for label, _, prefix, suffix in CAR_FIELDS)
+
+# Columns kept alongside the documents for structured pre-filtering
+FILTER_NUMERIC_COLUMNS: List[str] = ["SellingPrice", "Year", "Miles", "PassengerCapacity"]
+FILTER_CATEGORICAL_COLUMNS: List[str] = ["Fuel_Type", "Drivetrain"]
+
+
+@dataclass
+class FormatReport:
+    """Outcome of formatting an inventory feed"""
+    total_rows: int = 0
+    kept_rows: int = 0
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        reasons = ", ".join(f"{count} {reason}" for reason, count in self.dropped.items() if count)
+        return f"kept {self.kept_rows} of {self.total_rows} rows" + (f" (dropped {reasons})" if reasons else "")
+
+
+def _as_text(column: pd.Series) -> np.ndarray:
+    """Render a column the way an f-string renders each of its values"""
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_extension_array_dtype(column):
+        return column.to_numpy().astype(str).astype(object)
+    if not isinstance(column.dtype, pd.StringDtype):
+        column = column.astype(str)
+    return column.to_numpy(dtype=object, na_value="nan")
+
+
+def _as_thousands(column: pd.Series) -> np.ndarray:
+    """Render numeric values with thousands separators, leaving other values as text"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.map("{:,}".format).to_numpy(dtype=object)
+    numbers = pd.to_numeric(column, errors="coerce")
+    text = _as_text(column)
+    numeric = numbers.notna().to_numpy()
+    text[numeric] = numbers[numeric].map("{:,}".format).to_numpy(dtype=object)
+    return text
+
+
+def validate_inventory(df: pd.DataFrame) -> Tuple[pd.DataFrame, FormatReport]:
+    """Check the schema once and drop rows that cannot be served
+
+    A missing column fails the whole feed instead of silently dropping every
+    row. Rows without a VIN and repeated VINs are dropped and counted in the
+    returned report; VINs are stripped of surrounding whitespace.
+    """
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Inventory is missing required columns: {', '.join(missing_columns)}")
+
+    report = FormatReport(total_rows=len(df))
+
+    vins = df["VIN"].astype(str).str.strip()
+    no_vin = df["VIN"].isna() | (vins == "")
+    duplicate_vin = vins.duplicated() & ~no_vin
+    report.dropped["missing VIN"] = int(no_vin.sum())
+    report.dropped["duplicate VIN"] = int(duplicate_vin.sum())
+
+    keep = ~(no_vin | duplicate_vin)
+    df = df.assign(VIN=vins)[keep].reset_index(drop=True)
+    report.kept_rows = len(df)
+    return df, report
+
+
+def _field_texts(df: pd.DataFrame) -> List[np.ndarray]:
+    """Every document field of a validated frame rendered to text, one array per field"""
+    return [
+        _as_thousands(df[column]) if column == "Miles" else _as_text(df[column])
+        for _, column, _, _ in CAR_FIELDS
+    ]
+
+
+def format_car_documents(df: pd.DataFrame) -> List[str]:
+    """Format every row of a validated inventory frame in one columnar pass"""
+    if df.empty:
+        return []
+
+    # Render each column to text once, then fill one template per row; chained
+    # Series additions would copy every document once per field
+    return [DOCUMENT_TEMPLATE % fields for fields in zip(*_field_texts(df))]
+
+
+class StringColumn:
+    """High-cardinality text column packed into one UTF-8 buffer plus row offsets"""
+
+    def __init__(self, values: Sequence[str]):
+        encoded = [value.encode("utf-8") for value in values]
+        self.data = b"".join(encoded)
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_buffers(cls, data, offsets: np.ndarray) -> "StringColumn":
+        """Wrap an existing buffer and offsets, e.g. memory-mapped from an index artifact"""
+        column = cls.__new__(cls)
+        column.data = data
+        column.offsets = offsets
+        return column
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        data = bytes(self.data)
+        offsets = self.offsets.tolist()
+        return [data[start:stop].decode("utf-8") for start, stop in zip(offsets, offsets[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.nbytes
+
+
+class InternedColumn:
+    """Repetitive text column stored once per distinct value plus compact integer codes"""
+
+    def __init__(self, values: Sequence[str]):
+        categorical = pd.Categorical(values)
+        self.codes = categorical.codes
+        self.categories: List[str] = list(categorical.categories)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, categories: List[str]) -> "InternedColumn":
+        column = cls.__new__(cls)
+        column.codes = codes
+        column.categories = categories
+        return column
+
+    def __getitem__(self, row: int) -> str:
+        return self.categories[self.codes[row]]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(sys.getsizeof(value) for value in self.categories)
+
+
+# Columns with at most this share of distinct values are interned
+INTERN_MAX_DISTINCT_RATIO = 0.5
+
+
+def _encode_field(values: np.ndarray) -> Union[StringColumn, InternedColumn]:
+    distinct = len(pd.unique(values))
+    if distinct <= INTERN_MAX_DISTINCT_RATIO * len(values):
+        return InternedColumn(values)
+    return StringColumn(values)
+
+
+def fingerprint(document: str) -> int:
+    """Stable 64-bit digest of a document, the same in every process"""
+    return int.from_bytes(hashlib.blake2b(document.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def strings_nbytes(documents: Sequence[str]) -> int:
+    """Resident size of documents held as a list of Python strings"""
+    return sys.getsizeof(documents) + sum(sys.getsizeof(document) for document in documents)
+
+
+class CarTable(SequenceABC):
+    """Columnar store of the formatted car documents.
+
+    Each document field is kept once per row as packed UTF-8 (StringColumn)
+    or, for repetitive fields such as Make, Model, colors and Fuel_Type, as
+    codes into interned values (InternedColumn). Indexing renders a document
+    on demand, so only the handful of cars that go into a prompt ever exist
+    as full strings.
+    """
+
+    def __init__(self, fields: List[np.ndarray], documents: Sequence[str]):
+        self.columns = [_encode_field(values) for values in fields]
+        # Per-row hashes let a sync spot unchanged cars without rendering them
+        self.fingerprints = np.fromiter(map(fingerprint, documents), dtype=np.int64, count=len(documents))
+
+    @classmethod
+    def from_columns(cls, columns: List[Union[StringColumn, InternedColumn]],
+                     fingerprints: np.ndarray) -> "CarTable":
+        """Reassemble a table from stored columns, e.g. from an index artifact"""
+        table = cls.__new__(cls)
+        table.columns = columns
+        table.fingerprints = fingerprints
+        return table
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("car row out of range")
+        return DOCUMENT_TEMPLATE % tuple(column[row] for column in self.columns)
+
+    def row_equals(self, row: int, document: str) -> bool:
+        """Whether a row still renders to document, judged by its fingerprint"""
+        return bool(self.fingerprints[row] == fingerprint(document))
+
+    @property
+    def nbytes(self) -> int:
+        return self.fingerprints.nbytes + sum(column.nbytes for column in self.columns)
+
+
+def build_car_table(df: pd.DataFrame) -> Tuple[CarTable, List[str]]:
+    """Format a validated frame into a columnar table plus its rendered documents
+
+    The rendered list is for embedding and cache keys at load time and can be
+    dropped afterwards; the table is what stays resident.
+    """
+    fields = _field_texts(df) if not df.empty else [np.array([], dtype=object) for _ in CAR_FIELDS]
+    documents = [DOCUMENT_TEMPLATE % row for row in zip(*fields)]
+    return CarTable(fields, documents), documents
+
+
+class CategoricalColumn:
+    """Low-cardinality text column stored as integer codes into its distinct values"""
+
+    def __init__(self, values: pd.Series):
+        categorical = pd.Categorical(values.astype(str).str.strip().str.lower())
+        self.codes = categorical.codes
+        self.categories = np.asarray(categorical.categories, dtype=object)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, categories: List[str]) -> "CategoricalColumn":
+        column = cls.__new__(cls)
+        column.codes = codes
+        column.categories = np.asarray(categories, dtype=object)
+        return column
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def matches(self, include: List[str], exclude: Sequence[str] = ()) -> np.ndarray:
+        """Mask of rows whose value contains any include and no exclude substring"""
+        wanted = [
+            code for code, category in enumerate(self.categories)
+            if any(term in category for term in include) and not any(term in category for term in exclude)
+        ]
+        return np.isin(self.codes, wanted)
+
+
+def filter_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """Columnar copies of the fields structured query filters run against"""
+    columns: Dict[str, Any] = {
+        column: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+        for column in FILTER_NUMERIC_COLUMNS
+    }
+    columns.update({column: CategoricalColumn(df[column]) for column in FILTER_CATEGORICAL_COLUMNS})
+    return columns
+
+
+@dataclass(frozen=True)
+class Inventory:
+    """Immutable snapshot of the loaded cars and their embeddings.
+
+    Readers grab a reference once per query and writers publish a new
+    snapshot with a single attribute assignment, so a sync never exposes a
+    half-updated set of documents, embeddings and search index. Embeddings
+    are L2-normalized contiguous float32, so cosine similarity is a plain dot
+    product at query time. Documents are rendered from the columnar table
+    when indexed.
+    """
+    documents: CarTable
+    embeddings: np.ndarray
+    vins: Union[List[str], StringColumn]
+    index: VectorIndex
+    columns: Dict[str, Any]
+
+    @cached_property
+    def rows_by_vin(self) -> Dict[str, int]:
+        """Row of each VIN, built on first use since only syncs and follow-up questions need it"""
+        vins = self.vins.tolist() if isinstance(self.vins, StringColumn) else self.vins
+        return {vin: i for i, vin in enumerate(vins)}
+
+    def __len__(self) -> int:
+        return len(self.documents)
@@ -0,0 +1,176 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS: List[float] = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# The trace of the query being handled, if it was sampled. A context variable
+# follows the query into asyncio.to_thread workers and async generators
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("query_trace", default=None)
+
+
+@dataclass
+class QueryTrace:
+    """Per-stage timings (seconds) and counters of one sampled query"""
+    operation: str
+    started_at: float = field(default_factory=time.time)
+    stages: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    clock_start: float = field(default_factory=time.perf_counter, repr=False)
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class Metrics:
+    """Samples queries and aggregates their stage timings and counters.
+
+    Only a sample_rate share of queries is traced; for the rest stage() and
+    count() cost one context-variable lookup. Every finished trace is passed
+    to the optional callback (e.g. to forward it to a tracing backend), and
+    the aggregates are available as Prometheus text exposition.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, callback: Optional[Callable[[QueryTrace], None]] = None):
+        self.sample_rate = sample_rate
+        self.callback = callback
+        self.sampled = 0
+        self._histograms: Dict[str, _Histogram] = {}
+        self._totals: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self, operation: str) -> Optional[QueryTrace]:
+        """Begin a trace without making it current, or None if the query is not sampled
+
+        For work that yields to its caller (generators), which must only
+        activate() the trace around its own steps: a trace left current
+        across a yield would collect whatever the caller does meanwhile.
+        Inside another trace this returns None and the work joins that one.
+        """
+        if _current_trace.get() is not None or random.random() >= self.sample_rate:
+            return None
+        return QueryTrace(operation)
+
+    @contextmanager
+    def activate(self, trace: Optional[QueryTrace]) -> Iterator[None]:
+        """Make trace current for the enclosed block, which must not yield"""
+        if trace is None:
+            yield
+            return
+        token = _current_trace.set(trace)
+        try:
+            yield
+        finally:
+            _current_trace.reset(token)
+
+    def finish(self, trace: Optional[QueryTrace]) -> None:
+        """Close a trace from start() and add it to the aggregates"""
+        if trace is None:
+            return
+        trace.stages["total"] = time.perf_counter() - trace.clock_start
+        self._finish(trace)
+
+    @contextmanager
+    def trace(self, operation: str) -> Iterator[Optional[QueryTrace]]:
+        """Trace the enclosed query if it is sampled; nested calls join the outer trace
+
+        Not for generators; see start().
+        """
+        trace = self.start(operation)
+        if trace is None:
+            yield _current_trace.get()
+            return
+        try:
+            with self.activate(trace):
+                yield trace
+        finally:
+            self.finish(trace)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a stage of the current trace"""
+        trace = _current_trace.get()
+        if trace is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.stages[name] = trace.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add a stage timing measured by the caller, for stages that span yields"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages[name] = trace.stages.get(name, 0.0) + seconds
+
+    def active(self) -> bool:
+        """Whether the current query is being traced, to skip work only a trace needs"""
+        return _current_trace.get() is not None
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add to a counter of the current trace"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.counters[name] = trace.counters.get(name, 0) + value
+
+    def _finish(self, trace: QueryTrace) -> None:
+        with self._lock:
+            self.sampled += 1
+            for stage, seconds in trace.stages.items():
+                key = f"{trace.operation}:{stage}"
+                self._histograms.setdefault(key, _Histogram()).observe(seconds)
+            for name, value in trace.counters.items():
+                self._totals[name] = self._totals.get(name, 0) + value
+        if self.callback is not None:
+            try:
+                self.callback(trace)
+            except Exception as e:
+                logger.warning(f"Metrics callback failed: {str(e)}")
+
+    def render_prometheus(self, prefix: str = "assistant") -> str:
+        """Aggregated stage latencies and counters in the Prometheus text format"""
+        with self._lock:
+            histograms = {key: (list(h.buckets), h.count, h.sum) for key, h in self._histograms.items()}
+            totals = dict(self._totals)
+            sampled = self.sampled
+
+        lines = [
+            f"# HELP {prefix}_traced_queries_total Queries sampled for tracing",
+            f"# TYPE {prefix}_traced_queries_total counter",
+            f"{prefix}_traced_queries_total {sampled}",
+            f"# HELP {prefix}_stage_seconds Time spent per stage of sampled queries",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for key, (buckets, count, total) in sorted(histograms.items()):
+            operation, stage = key.split(":", 1)
+            labels = f'operation="{operation}",stage="{stage}"'
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {total}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {count}")
+        for name, value in sorted(totals.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
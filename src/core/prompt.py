@@ -0,0 +1,252 @@
+import logging
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Static instructions sent as the first system message of every sales
+# conversation. Keep this text stable: it is the prefix the provider caches
+SALES_INSTRUCTIONS = """You are Hennyi, an experienced car salesperson who is professional, adaptive, and focused on closing deals. Your responses should be brief but impactful, always aiming to move the conversation towards a sale while maintaining authenticity.
+
+[CRITICAL RULES: 
+1. Only recommend vehicles that exist in the provided csv file.
+2. When encountering a vehicle with price showing as $0:
+   - Do not mention the actual $0 price
+   - Instead say "Price: Contact for special pricing"
+   - If customer asks specifically about that vehicle's price, respond with "This vehicle has special pricing. I'd be happy to discuss the details in person or over the phone."
+   - Focus on the vehicle's features and benefits
+   - Encourage direct contact for pricing discussion
+3. For all vehicles with regular pricing:
+   - Always show the actual price
+   - Be transparent about all costs
+4. Never make up or guess prices]
+
+[Vehicle Classification Rules]
+    
+Electric Vehicles (EV):
+Pure electric vehicle
+Examples: Tesla, Nissan Leaf
+Hybrid Vehicles:
+Combines gas engine and electric motor
+Examples: Toyota Prius, Ford Fusion Hybrid
+Traditional Vehicles:
+Gas or diesel engines only
+
+THINKING FRAMEWORK:
+
+1. Customer Understanding Phase
+- Interpret customer's explicit and implicit needs
+- Analyze customer's communication style and mood
+- Identify key buying signals or objections
+- Consider customer's price sensitivity
+- Map customer requests to available inventory
+
+2. Vehicle Matching Process
+- Compare customer needs with available inventory
+- Consider multiple vehicle options
+- Evaluate price alignment
+- Assess feature relevance
+- Prepare alternative suggestions
+
+3. Response Strategy Development
+- Choose appropriate communication style
+- Structure information hierarchy
+- Plan closing technique
+- Prepare for potential objections
+- Design next steps
+
+Core Response Behaviors:
+
+1. Response Style
+- Keep all responses under 3 sentences unless specifically asked for details
+- Always shows three possible options
+- Lead with the most relevant information first
+- Use natural, conversational language
+- Maintain professionalism even when faced with casual or rude behavior
+
+2. Sales Strategy
+- Always include price ranges when mentioning specific models
+- When introducing specific models, always bring proper length of details
+- Respond to budget-related keywords (like "broke", "expensive", "cheap") with appropriate options
+- When lacking inventory information, focus on general recommendations and invite store visits
+- Look for opportunities to suggest viewing available vehicles in person
+
+3. Customer Interaction
+- Match the customer's communication style while staying professional
+- Handle non-serious queries (like jokes) with brief, friendly responses before steering back to sales
+- For unclear requests, provide one quick clarification question followed by a suggestion
+- When faced with rudeness, respond once professionally then wait for serious queries
+- When customer shows interest in test drives, guide them to click Appointment link: 
+
+4. Information Hierarchy
+- Price -> Features -> Technical details
+- Always mention price ranges with vehicle suggestions
+- 
+- Keep technical explanations simple unless specifically asked for details
+- Focus on practical benefits over technical specifications
+
+5. Closing Techniques
+- End each response with a subtle call to action
+- When suggesting test drives, specifically mention the "Appointment" link : "https://www.example.com" for easy scheduling
+- Suggest store visits or test drives when interest is shown
+- Provide clear next steps for interested customers
+- Be direct about availability and options
+
+INTERNAL DIALOGUE GUIDELINES:
+
+Before each response, think through:
+1. Customer Profile
+- What is their apparent budget level?
+- What style of communication are they using?
+- What signals are they giving about their interests?
+- What potential objections might they have?
+
+2. Product Selection
+- Which vehicles in our inventory match their needs?
+- What are the key selling points for these options?
+- What alternatives should we have ready?
+- How do our options align with their budget?
+
+3. Sales Approach
+- What tone should I use in my response?
+- How can I move this conversation toward a sale?
+- What would be the most effective call to action?
+- How can I overcome potential objections?
+
+Response Templates:
+- For jokes/non-serious queries: Brief acknowledgment + one vehicle suggestion
+- For rude comments: Make a joke and then steer the conversation to sales
+- For specific vehicle interests: Price range + key features + next step
+- For general queries: 2-3 options with price ranges + simple comparison
+- For test drive inquiries: Mention the "https://www.example.com" link convenience (e.g., "Feel free to click the Appointment website above to schedule your test drive!")
+
+When suggesting vehicles, use this format:
+Brand Model Name Price Range Key Benefit Available Action
+
+[CRITICAL RULE: Only recommend vehicles that exist in the provided csv file.]
+
+"""
+
+INVENTORY_HEADER = "Please base your recommendations on the following vehicle data:\n"
+
+REFERENCE_INSTRUCTIONS = """You are Hennyi, an experienced car salesperson. When discussing a specific car that was previously mentioned:
+        1. Be consistent with the details you provided before
+        2. Focus on this specific car's features and benefits
+        3. Encourage test drive scheduling with link : "https://www.example.com"
+        4. Maintain continuous context
+        5. If you realize any previous information was incorrect, acknowledge it professionally
+        
+        """
+
+REFERENCE_HEADER = "Current vehicle information:\n        "
+
+# Tokens the chat format adds around every message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Rough ratio used to estimate token counts when no tiktoken encoding is available
+CHARS_PER_TOKEN = 4
+
+
+def _load_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+class TokenCounter:
+    """Counts tokens locally with the model's tiktoken encoding, or estimates them"""
+
+    def __init__(self, model: str, cache_size: int = 4096):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = _load_encoding(model)
+            except Exception as e:
+                # The BPE file is downloaded on first use, which fails offline
+                logger.warning(f"Could not load the tiktoken encoding, estimating token counts: {str(e)}")
+        # History messages are recounted on every turn, so remember their counts
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def message(self, message: Dict[str, str]) -> int:
+        """Tokens a chat message costs, including the per-message overhead"""
+        return self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptBuilder:
+    """Assembles chat messages that fit an input token budget.
+
+    Messages are laid out as static instructions, conversation history,
+    retrieved cars, then the customer's query. The instructions never change
+    between requests and history only grows at its end, so consecutive turns
+    share a long identical prefix that provider-side prompt caching can reuse.
+
+    When the budget is exceeded the oldest history turns go first, then the
+    lowest-ranked cars; the instructions, the query and the best match are
+    always sent.
+    """
+
+    def __init__(self, counter: TokenCounter, max_input_tokens: int, max_history_turns: int):
+        self.counter = counter
+        self.max_input_tokens = max_input_tokens
+        self.max_history_turns = max_history_turns
+
+    def build(self, user_query: str, relevant_cars: str, history: Sequence[Dict[str, str]],
+              reference: bool = False) -> List[Dict[str, str]]:
+        """Return the messages for a query, its retrieved cars and the prior turns"""
+        instructions = REFERENCE_INSTRUCTIONS if reference else SALES_INSTRUCTIONS
+        header = REFERENCE_HEADER if reference else INVENTORY_HEADER
+        count = self.counter.count
+
+        used = (
+            count(instructions) + count(header) + count(user_query)
+            + 3 * MESSAGE_OVERHEAD_TOKENS
+        )
+        budget = self.max_input_tokens - used
+
+        cars = relevant_cars.split("\n")
+        car_tokens = [count(car) + 1 for car in cars]
+        kept_cars = len(cars)
+        while kept_cars > 1 and sum(car_tokens[:kept_cars]) > budget:
+            kept_cars -= 1
+        budget -= sum(car_tokens[:kept_cars])
+
+        turns = self._fit_history(history, budget)
+
+        if kept_cars < len(cars) or len(turns) < min(len(history), self.max_history_turns * 2):
+            logger.debug(
+                "Prompt trimmed to %d/%d cars and %d history turns to fit %d tokens",
+                kept_cars, len(cars), len(turns) // 2, self.max_input_tokens
+            )
+
+        return [
+            {"role": "system", "content": instructions},
+            *turns,
+            {"role": "system", "content": header + "\n".join(cars[:kept_cars])},
+            {"role": "user", "content": user_query},
+        ]
+
+    def _fit_history(self, history: Sequence[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        """Newest whole exchanges of the history that fit within budget tokens"""
+        start = max(0, len(history) - self.max_history_turns * 2)
+        kept = len(history)
+        while kept - 2 >= start:
+            cost = self.counter.message(history[kept - 2]) + self.counter.message(history[kept - 1])
+            if cost > budget:
+                break
+            budget -= cost
+            kept -= 2
+        return list(history[kept:])
+
+    def count_messages(self, messages: Sequence[Dict[str, str]]) -> int:
+        """Total input tokens of a list of chat messages"""
+        return sum(self.counter.message(message) for message in messages)
@@ -0,0 +1,94 @@
+import tempfile
+import numpy as np
+from typing import Optional
+
+STORAGE_TYPES = ("float32", "int8")
+
+
+class QuantizedEmbeddings:
+    """Compact copy of an L2-normalized float32 matrix used for candidate scoring.
+
+    int8 quarters the size, storing each row as int8 codes plus one float32
+    scale (the row's largest magnitude / 127). Indexing and matrix products
+    dequantize on the fly, so the object can stand in for the float32 matrix
+    inside the vector indexes.
+    """
+
+    def __init__(self, embeddings: np.ndarray, storage: str = "int8", chunk_size: int = 16384):
+        check_storage(storage)
+        if storage != "int8":
+            raise ValueError(f"Unknown quantized storage type: {storage}")
+        self.storage = storage
+        self.chunk_size = chunk_size
+        self.codes = np.empty(embeddings.shape, dtype=np.int8)
+        self.scales = np.empty(len(embeddings), dtype=np.float32)
+        for start in range(0, len(embeddings), chunk_size):
+            chunk = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            scales = np.abs(chunk).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self.codes[start:start + chunk_size] = np.rint(chunk / scales[:, None])
+            self.scales[start:start + chunk_size] = scales
+
+    @classmethod
+    def from_arrays(cls, codes: np.ndarray, scales: np.ndarray,
+                    chunk_size: int = 16384) -> "QuantizedEmbeddings":
+        """Wrap existing codes and scales, e.g. memory-mapped from an index artifact"""
+        quantized = cls.__new__(cls)
+        quantized.storage = "int8"
+        quantized.codes = codes
+        quantized.scales = scales
+        quantized.chunk_size = chunk_size
+        return quantized
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Dequantized float32 rows"""
+        rows = self.codes[key].astype(np.float32)
+        rows *= self.scales[key][..., None]
+        return rows
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        """Scores of every row against a query vector or matrix, in bounded chunks"""
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), self.chunk_size):
+            stop = start + self.chunk_size
+            np.matmul(self.codes[start:stop].astype(np.float32), other, out=out[start:stop])
+        out *= self.scales.reshape((-1,) + (1,) * (out.ndim - 1))
+        return out
+
+
+def check_storage(storage: str) -> None:
+    """Raise ValueError unless storage is one of STORAGE_TYPES"""
+    if storage == "float16":
+        raise ValueError(
+            "float16 embedding storage is not supported: NumPy has no fast float16 matmul, "
+            "so scans are slower than float32. Use int8 to save memory"
+        )
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown embedding storage type: {storage}")
+
+
+def spill_to_disk(embeddings: np.ndarray, directory: Optional[str] = None) -> np.ndarray:
+    """Move a matrix to an anonymous memory-mapped file so it is not resident
+
+    Pages are read back on demand, which suits rescoring a few candidate rows
+    per query. The file is unlinked already and vanishes with the mapping.
+    directory defaults to the system temp dir, which is often a RAM-backed
+    tmpfs; point it at a real disk for the spill to save memory.
+    """
+    backing = tempfile.TemporaryFile(prefix="embeddings-", dir=directory)
+    spilled = np.memmap(backing, dtype=embeddings.dtype, mode="w+", shape=embeddings.shape)
+    spilled[:] = embeddings
+    spilled.flush()
+    return spilled
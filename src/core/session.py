@@ -0,0 +1,22 @@
+import uuid
+import threading
+from typing import Dict, List
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ChatSession:
+    """Conversation state of one customer
+
+    Everything a conversation mutates lives here, so any number of sessions
+    can share one CarSalesAssistant (model, inventory and index) safely.
+    """
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    last_recommendations: List[str] = field(default_factory=list)  # Cache for recommendations
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def clear_history(self) -> None:
+        """Forget the conversation so far"""
+        with self.lock:
+            self.conversation_history = []
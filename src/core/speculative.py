@@ -0,0 +1,113 @@
+import re
+import logging
+import threading
+from typing import List, Optional, Tuple
+from .session import ChatSession
+
+logger = logging.getLogger(__name__)
+
+# Final transcripts often gain closing punctuation that partials lack
+_TRAILING_PUNCTUATION = re.compile(r"[.?!]+$")
+
+
+class SpeculativeRetriever:
+    """Retrieves cars for a voice query while the customer is still speaking
+
+    Each partial transcript passed to update() starts query embedding and
+    retrieval on a background thread, newest transcript first, so the work
+    overlaps with speech. finish() takes the final transcript: if a
+    speculative run was for the same query, against the same inventory and
+    the same previous recommendations, its result is reused and only then
+    committed to the session; otherwise it is discarded and retrieval runs
+    normally. Speculation never touches the session, so a wrong guess costs
+    CPU time only.
+    """
+
+    def __init__(self, assistant, session: Optional[ChatSession] = None,
+                 threshold: float = 0.2, min_words: int = 2):
+        self.assistant = assistant
+        self.session = session or assistant.default_session
+        self.threshold = threshold
+        self.min_words = min_words
+        self.reused = 0
+        self.discarded = 0
+        self._pending: Optional[str] = None
+        self._running: Optional[str] = None
+        self._result: Optional[Tuple[str, tuple, str, Optional[List[str]]]] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def _key(self, text: str) -> str:
+        return _TRAILING_PUNCTUATION.sub("", self.assistant.normalize_query(text))
+
+    def _snapshot(self) -> tuple:
+        # Identities, not contents: both are replaced rather than mutated
+        return (self.assistant.inventory, self.session.last_recommendations)
+
+    def update(self, partial: str) -> None:
+        """Start retrieval for a partial transcript; safe to call from any thread"""
+        # Constraints, references and embeddings all ignore case and spacing,
+        # so the normalized query stands in for the transcript
+        key = self._key(partial)
+        if len(key.split()) < self.min_words:
+            return
+        with self._lock:
+            if self._closed or key in (self._running, self._pending):
+                return
+            if self._result is not None and self._result[0] == key:
+                return
+            if self._running is not None:
+                # Only the newest transcript is worth computing next
+                self._pending = key
+                return
+            self._running = key
+        threading.Thread(target=self._run, args=(key,), name="speculative-retrieval", daemon=True).start()
+
+    def _run(self, key: str) -> None:
+        while key is not None:
+            snapshot = self._snapshot()
+            try:
+                recommendations, picks = self.assistant._search(key, self.threshold, snapshot[0], snapshot[1])
+            except Exception as e:
+                logger.warning(f"Speculative retrieval failed: {str(e)}")
+                recommendations = None
+            with self._lock:
+                if recommendations is not None:
+                    self._result = (key, snapshot, recommendations, picks)
+                key, self._pending = (None if self._closed else self._pending), None
+                self._running = key
+                if key is None:
+                    self._idle.notify_all()
+
+    def finish(self, final: str) -> str:
+        """Relevant cars for the final transcript, committed to the session"""
+        key = self._key(final)
+        with self._lock:
+            self._closed = True
+            self._pending = None
+            # A run for this very query is nearly done; waiting beats starting over
+            while self._running == key:
+                self._idle.wait()
+            result = self._result
+
+        inventory, last_recommendations = self._snapshot()
+        if (result is not None and result[0] == key
+                and result[1][0] is inventory and result[1][1] is last_recommendations):
+            self.reused += 1
+            logger.debug("Reusing speculative retrieval for: %s", key)
+            _, _, recommendations, picks = result
+            if picks is not None:
+                self.session.last_recommendations = picks
+            return recommendations
+
+        if result is not None:
+            self.discarded += 1
+            logger.debug("Discarding speculative retrieval for: %s", result[0])
+        return self.assistant.get_relevant_cars(final, self.threshold, session=self.session)
+
+    def close(self) -> None:
+        """Stop speculating, e.g. when listening was cancelled"""
+        with self._lock:
+            self._closed = True
+            self._pending = None
@@ -1,25 +1,527 @@
+import os
+import re
+import json
+import time
+import queue
+import argparse
+import logging
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import speech_recognition as sr
+try:
+    import vosk
+except ImportError:  # the offline backend needs `pip install vosk` and a downloaded model
+    vosk = None
 
-def real_time_speech_to_text():
-    text = ''
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
+logger = logging.getLogger(__name__)
 
-    #print("Adjusting for ambient noise... Please wait.")
-    with microphone as source:
-        recognizer.adjust_for_ambient_noise(source)
-        print("Listening... Speak into the microphone.")
+
+class RecognizerBackend(ABC):
+    """Turns captured audio into text and keeps its recent transcription latencies"""
+
+    name = "base"
+    # Backends that can transcribe while the user is still speaking
+    supports_partials = False
+    # Capture rate the engine works at natively, if it has one
+    sample_rate: Optional[int] = None
+
+    def __init__(self, history: int = 256):
+        self.timings = deque(maxlen=history)
+
+    def load(self) -> None:
+        """Do slow one-off setup (e.g. loading a model) before the first utterance"""
+
+    @abstractmethod
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        """Return the transcript, or None if the audio holds no intelligible speech
+
+        Raises sr.RequestError when the engine itself is unavailable.
+        """
+
+    def stream(self) -> "TranscriptStream":
+        """Start transcribing an utterance whose audio arrives in chunks"""
+        return TranscriptStream(self)
+
+    def _record(self, seconds: float, audio_seconds: float) -> None:
+        self.timings.append(seconds)
+        logger.debug("%s transcribed %.1fs of audio in %.0f ms", self.name, audio_seconds, seconds * 1000)
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            return self.recognize(audio)
+        finally:
+            self._record(time.perf_counter() - started, audio_duration(audio))
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Count and p50/p95/mean of recent transcription latencies, in milliseconds"""
+        if not self.timings:
+            return {"count": 0}
+        ms = np.asarray(self.timings) * 1000
+        return {"count": len(ms), "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)), "mean_ms": float(ms.mean())}
+
+
+def audio_duration(audio: sr.AudioData) -> float:
+    return len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+
+class TranscriptStream:
+    """One utterance being transcribed as its audio arrives
+
+    accept() takes the next chunk and returns the transcript so far, or
+    None if the backend cannot tell yet. result() returns the final
+    transcript once the utterance has ended; only the time it takes counts
+    as transcription latency, since earlier work overlaps with speech.
+    """
+
+    def __init__(self, backend: RecognizerBackend):
+        self.backend = backend
+        self.chunks: List[sr.AudioData] = []
+
+    def audio(self) -> sr.AudioData:
+        first = self.chunks[0]
+        return sr.AudioData(b"".join(chunk.frame_data for chunk in self.chunks), first.sample_rate, first.sample_width)
+
+    def accept(self, chunk: sr.AudioData) -> Optional[str]:
+        self.chunks.append(chunk)
+        return None
+
+    def result(self) -> Optional[str]:
+        if not self.chunks:
+            return None
+        return self.backend.transcribe(self.audio())
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API; needs network access for every utterance"""
+
+    name = "google"
+
+    def __init__(self, language: str = "en-US", **kwargs):
+        super().__init__(**kwargs)
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline Kaldi recognition on the CPU, for machines without network access
+
+    model_path is an unpacked model from https://alphacephei.com/vosk/models;
+    the small English model (~50 MB) transcribes faster than real time on
+    one core. Audio is decoded as it is captured, so partial transcripts are
+    available while the user speaks and little work is left at the end.
+    """
+
+    name = "vosk"
+    supports_partials = True
+    sample_rate = 16000
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self._model is not None:
+                return
+            if vosk is None:
+                raise ImportError("The vosk backend needs the vosk package: pip install vosk")
+            if not os.path.isdir(self.model_path):
+                raise FileNotFoundError(f"Vosk model not found at {self.model_path}")
+            vosk.SetLogLevel(-1)
+            logger.info(f"Loading Vosk model {self.model_path}")
+            self._model = vosk.Model(self.model_path)
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        stream = _VoskStream(self)
+        stream.accept(audio)
+        return stream.final_text()
+
+    def stream(self) -> "TranscriptStream":
+        return _VoskStream(self)
+
+
+class _VoskStream(TranscriptStream):
+    def __init__(self, backend: VoskBackend):
+        super().__init__(backend)
+        backend.load()
+        self.recognizer = vosk.KaldiRecognizer(backend._model, backend.sample_rate)
+        self.segments: List[str] = []
+        self.audio_seconds = 0.0
+
+    def accept(self, chunk: sr.AudioData) -> Optional[str]:
+        self.audio_seconds += audio_duration(chunk)
+        data = chunk.get_raw_data(convert_rate=self.backend.sample_rate, convert_width=2)
+        if self.recognizer.AcceptWaveform(data):
+            # Vosk closed a segment at a pause; its text is final
+            self.segments.append(json.loads(self.recognizer.Result()).get("text", ""))
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(text for text in [*self.segments, partial] if text) or None
+
+    def final_text(self) -> Optional[str]:
+        self.segments.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return " ".join(text for text in self.segments if text) or None
+
+    def result(self) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            return self.final_text()
+        finally:
+            self.backend._record(time.perf_counter() - started, self.audio_seconds)
+
+
+def load_wav(path: str) -> sr.AudioData:
+    with sr.AudioFile(path) as source:
+        return sr.Recognizer().record(source)
+
+
+def load_wav_transcripts(directory: str) -> Dict[str, str]:
+    """Map each WAV in directory to the expected transcript in its .txt sidecar"""
+    transcripts = {}
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        sidecar = os.path.join(directory, stem + ".txt")
+        if ext.lower() == ".wav" and os.path.exists(sidecar):
+            with open(sidecar, "r", encoding="utf-8") as f:
+                transcripts[os.path.join(directory, name)] = f.read().strip()
+    return transcripts
+
+
+class ScriptedBackend(RecognizerBackend):
+    """TEST STAND-IN: answers with the known transcript of each recorded WAV
+
+    Audio is matched against the samples of the recordings, so clips
+    replayed through load_wav() or a fake microphone come back as their
+    .txt sidecar text and anything else as unintelligible. While a clip is
+    streamed in, partial transcripts reveal its words in proportion to the
+    audio received. latency simulates engine time.
+    """
+
+    name = "scripted"
+    supports_partials = True
+
+    def __init__(self, clips: Sequence[Tuple[bytes, str]], latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.clips = list(clips)
+        self.latency = latency
+
+    @classmethod
+    def from_directory(cls, directory: str, latency: float = 0.0) -> "ScriptedBackend":
+        return cls([(load_wav(path).frame_data, text) for path, text in load_wav_transcripts(directory).items()],
+                   latency)
+
+    def _match(self, frame_data: bytes) -> Tuple[Optional[str], float]:
+        """The transcript of the clip the audio comes from and the share of it heard"""
+        if frame_data:
+            for clip, text in self.clips:
+                if frame_data in clip:
+                    return text, len(frame_data) / len(clip)
+        return None, 0.0
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        text, _ = self._match(audio.frame_data)
+        return text
+
+    def stream(self) -> "TranscriptStream":
+        return _ScriptedStream(self)
+
+
+class _ScriptedStream(TranscriptStream):
+    def accept(self, chunk: sr.AudioData) -> Optional[str]:
+        super().accept(chunk)
+        text, heard = self.backend._match(self.audio().frame_data)
+        if text is None:
+            return None
+        words = text.split()
+        return " ".join(words[:round(len(words) * heard)]) or None
+
+
+BACKENDS = ("google", "vosk", "scripted")
+
+def create_backend(kind: str = "google", **options) -> RecognizerBackend:
+    if kind == "google":
+        return GoogleBackend(**options)
+    if kind == "vosk":
+        return VoskBackend(**options)
+    if kind == "scripted":
+        return ScriptedBackend.from_directory(**options)
+    raise ValueError(f"Unknown speech recognizer backend: {kind}")
+
+
+def load_backend(config_path: str = "data/config.json") -> RecognizerBackend:
+    """The backend named by stt_backend in the app config, Google if unset
+
+    Air-gapped machines set "stt_backend": "vosk" and "vosk_model_path".
+    """
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            system_config = json.load(f)
+    except FileNotFoundError:
+        system_config = {}
+    kind = system_config.get("stt_backend", "google")
+    if kind == "vosk":
+        return create_backend(kind, model_path=system_config["vosk_model_path"])
+    if kind == "scripted":
+        return create_backend(kind, directory=system_config["stt_wav_dir"])
+    return create_backend(kind)
+
+
+class MicrophoneListener:
+    """Keeps one microphone stream open and captures utterances on demand
+
+    Opening the microphone and calibrating for ambient noise take about a
+    second, so both happen once when the listener starts. While nobody is
+    listening the energy threshold is recalibrated every
+    calibration_interval seconds, so it tracks the room without adding to
+    the time it takes to answer the next button press. Captured utterances
+    are handed over through a queue; listen() turns them into text.
+
+    With a backend that supports partials, audio is fed to it chunk by
+    chunk as the user speaks and listen()'s on_partial callback receives
+    each new partial transcript, so callers can start work before the
+    utterance ends.
+    """
+
+    def __init__(self, backend: Optional[RecognizerBackend] = None, recognizer: Optional[sr.Recognizer] = None,
+                 microphone: Optional[sr.Microphone] = None, calibration_interval: float = 60.0, calibration_duration: float = 0.5,
+                 phrase_time_limit: float = 15.0, poll_interval: float = 0.5):
+        self.backend = backend or GoogleBackend()
+        self.recognizer = recognizer or sr.Recognizer()
+        self.microphone = microphone or sr.Microphone(sample_rate=self.backend.sample_rate)
+        self.calibration_interval = calibration_interval
+        self.calibration_duration = calibration_duration
+        self.phrase_time_limit = phrase_time_limit
+        self.poll_interval = poll_interval
+        self.last_calibrated: Optional[float] = None
+        self._utterances: "queue.Queue[TranscriptStream]" = queue.Queue()
+        self._on_partial: Optional[Callable[[str], None]] = None
+        self._armed = threading.Event()
+        self._calibrated = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._listen_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Open the microphone and start capturing in the background; safe to call repeatedly"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._calibrated.clear()
+            self._error = None
+            self._thread = threading.Thread(target=self._run, name="microphone-listener", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop capturing and release the microphone"""
+        self._stopped.set()
+        self._armed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._armed.clear()
+
+    def _calibrate(self, source, duration: float) -> None:
+        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self.last_calibrated = time.monotonic()
+        logger.debug("Energy threshold calibrated to %.1f", self.recognizer.energy_threshold)
+
+    def _run(self) -> None:
+        try:
+            self.backend.load()
+            with self.microphone as source:
+                self._calibrate(source, max(self.calibration_duration, 1.0))
+                self._calibrated.set()
+                while not self._stopped.is_set():
+                    if not self._armed.is_set():
+                        # Idle: wake up to recalibrate, or as soon as someone listens
+                        due = self.last_calibrated + self.calibration_interval - time.monotonic()
+                        if not self._armed.wait(max(due, 0.0)):
+                            self._calibrate(source, self.calibration_duration)
+                        continue
+                    try:
+                        utterance = self._capture(source)
+                    except sr.WaitTimeoutError:
+                        continue
+                    if self._armed.is_set():
+                        self._utterances.put(utterance)
+        except Exception as e:
+            logger.error(f"Microphone listener stopped: {str(e)}")
+            self._error = e
+        finally:
+            self._calibrated.set()
+
+    def _capture(self, source) -> TranscriptStream:
+        """Record one phrase, feeding it to the backend as it arrives if the backend can use that"""
+        # A short timeout lets a cancelled listen() disarm us between phrases
+        if not self.backend.supports_partials:
+            utterance = self.backend.stream()
+            utterance.accept(self.recognizer.listen(source, timeout=self.poll_interval,
+                                                    phrase_time_limit=self.phrase_time_limit))
+            return utterance
+
+        utterance, last, previous = None, None, None
+        for chunk in self.recognizer.listen(source, timeout=self.poll_interval,
+                                            phrase_time_limit=self.phrase_time_limit, stream=True):
+            # listen(stream=True) yields the phrase's last buffer a second time
+            if previous is not None and chunk.frame_data == previous.frame_data:
+                continue
+            previous = chunk
+            if utterance is None:
+                utterance = self.backend.stream()
+            partial = utterance.accept(chunk)
+            on_partial = self._on_partial
+            if partial and partial != last and on_partial is not None and self._armed.is_set():
+                last = partial
+                try:
+                    on_partial(partial)
+                except Exception as e:
+                    logger.warning(f"Partial transcript callback failed: {str(e)}")
+        return utterance or TranscriptStream(self.backend)
+
+    def _drain(self) -> None:
         while True:
             try:
-                # Capture audio from the microphone
-                audio = recognizer.listen(source, timeout=20)
-                
-                # Convert speech to text using Google Web Speech API
-                text = recognizer.recognize_google(audio)
-                return text
-            except Exception as e:
-                pass
-           
-
-# Run the function
-#print(real_time_speech_to_text())
+                self._utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def listen(self, timeout: float = 20.0, cancel: Optional[threading.Event] = None,
+               on_partial: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Transcribe the next utterance, or return None on timeout or when cancel is set
+
+        Utterances that cannot be understood are skipped until the deadline.
+        on_partial is called from the capture thread with each new partial
+        transcript, if the backend produces them. Raises the listener's
+        error if the microphone could not be used, and sr.RequestError if
+        the backend could not transcribe (e.g. Google while offline).
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        if not self._calibrated.wait(timeout):
+            return None
+        if self._error is not None:
+            raise self._error
+
+        # One caller at a time; a cancelled caller gives way within poll_interval
+        if not self._listen_lock.acquire(timeout=max(deadline - time.monotonic(), 0.0)):
+            return None
+        self._drain()
+        self._on_partial = on_partial
+        self._armed.set()
+        try:
+            while not (cancel is not None and cancel.is_set()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                try:
+                    utterance = self._utterances.get(timeout=min(remaining, self.poll_interval))
+                except queue.Empty:
+                    if self._error is not None:
+                        raise self._error
+                    continue
+                try:
+                    text = utterance.result()
+                except sr.RequestError as e:
+                    # Not "nothing heard": callers must tell the user, e.g. when offline
+                    logger.warning(f"Speech recognition with {self.backend.name} failed: {str(e)}")
+                    raise
+                if text:
+                    return text
+                logger.debug("Could not understand audio, still listening")
+            return None
+        finally:
+            self._armed.clear()
+            self._on_partial = None
+            self._listen_lock.release()
+
+
+# One listener, and so one open microphone stream, shared by every caller
+_listener: Optional[MicrophoneListener] = None
+_listener_lock = threading.Lock()
+
+def get_listener() -> MicrophoneListener:
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = MicrophoneListener(load_backend())
+        _listener.start()
+        return _listener
+
+def real_time_speech_to_text(timeout: float = 20.0, cancel: Optional[threading.Event] = None,
+                             on_partial: Optional[Callable[[str], None]] = None) -> Optional[str]:
+    """Listen for one utterance on the shared microphone and return its text, or None if nothing was heard"""
+    return get_listener().listen(timeout, cancel, on_partial)
+
+
+def normalize_transcript(text: Optional[str]) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", (text or "").lower()))
+
+
+def benchmark_backends(backends: Sequence[RecognizerBackend], directory: str) -> Dict[str, Dict[str, float]]:
+    """Transcribe every WAV with a .txt sidecar in directory with each backend
+
+    Reports per-backend latency percentiles and the share of utterances
+    transcribed exactly (ignoring case and punctuation).
+    """
+    clips = [(load_wav(path), text) for path, text in load_wav_transcripts(directory).items()]
+    results = {}
+    for backend in backends:
+        started = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - started
+        backend.timings.clear()
+        correct = 0
+        for audio, expected in clips:
+            try:
+                text = backend.transcribe(audio)
+            except sr.RequestError as e:
+                logger.warning(f"{backend.name} failed: {str(e)}")
+                text = None
+            correct += normalize_transcript(text) == normalize_transcript(expected)
+        results[backend.name] = {
+            **backend.latency_stats(),
+            "exact_match": correct / max(1, len(clips)),
+            "load_seconds": load_seconds,
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure speech recognizer backends on recorded utterances")
+    parser.add_argument("wav_dir", help="directory of .wav clips, each with a .txt transcript of the same name")
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["google"])
+    parser.add_argument("--vosk-model", help="unpacked Vosk model directory")
+    args = parser.parse_args(argv)
+
+    backends = []
+    for kind in args.backend:
+        if kind == "vosk":
+            backends.append(create_backend(kind, model_path=args.vosk_model))
+        elif kind == "scripted":
+            backends.append(create_backend(kind, directory=args.wav_dir))
+        else:
+            backends.append(create_backend(kind))
+    print(json.dumps(benchmark_backends(backends, args.wav_dir), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,242 @@
+import time
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence, Tuple
+from .quantization import STORAGE_TYPES, QuantizedEmbeddings
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a C-contiguous float32 copy of matrix with unit-length rows"""
+    matrix = np.array(matrix, dtype=np.float32, order="C", ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the k highest scores, best first, in O(n + k log k)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top_k over a (queries x rows) score matrix, best first per row"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((len(scores), 0))
+        return empty.astype(np.int64), empty
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class VectorIndex(ABC):
+    """Searches a matrix of L2-normalized embeddings by cosine similarity"""
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return row indices and scores of the k best matches, best first
+
+        candidates is an optional boolean row mask; only rows set in it are
+        eligible.
+        """
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force search over every row"""
+
+    def search(self, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if candidates is not None:
+            rows = np.flatnonzero(candidates)
+            scores = self.embeddings[rows] @ query
+            selected = top_k(scores, k)
+            return rows[selected], scores[selected]
+        scores = self.embeddings @ query
+        indices = top_k(scores, k)
+        return indices, scores[indices]
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: rows are bucketed by their nearest k-means centroid
+    and a query only scans the buckets of its n_probe closest centroids.
+
+    More lists make each bucket smaller (faster, lower recall at a fixed
+    n_probe); more probes scan more buckets (slower, higher recall).
+    """
+
+    def __init__(self, embeddings: np.ndarray, n_lists: int = 0, n_probe: int = 8,
+                 train_iterations: int = 10, seed: int = 0):
+        super().__init__(embeddings)
+        n_rows = len(embeddings)
+        self.n_lists = max(1, min(n_lists or int(2 * np.sqrt(n_rows)), n_rows))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        self.centroids = self._train(embeddings, train_iterations, np.random.default_rng(seed))
+        assignments = self._assign(embeddings, self.centroids)
+        self.order = np.argsort(assignments, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))])
+
+    @classmethod
+    def from_arrays(cls, embeddings: np.ndarray, centroids: np.ndarray, order: np.ndarray,
+                    offsets: np.ndarray, n_probe: int = 8) -> "IVFIndex":
+        """Rebuild a trained index from its arrays without running k-means again"""
+        index = cls.__new__(cls)
+        VectorIndex.__init__(index, embeddings)
+        index.n_lists = len(centroids)
+        index.n_probe = max(1, min(n_probe, index.n_lists))
+        index.centroids = centroids
+        index.order = order
+        index.offsets = offsets
+        return index
+
+    def _train(self, embeddings: np.ndarray, iterations: int, rng: np.random.Generator) -> np.ndarray:
+        """Spherical k-means on a sample of rows"""
+        sample_size = min(len(embeddings), self.n_lists * 32)
+        sample = embeddings[np.sort(rng.choice(len(embeddings), sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = self._assign(sample, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+            centroids = normalize_rows(centroids)
+
+        return centroids
+
+    @staticmethod
+    def _assign(rows: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Index of the closest centroid for every row, in bounded-memory chunks"""
+        assignments = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def search(self, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if candidates is not None and candidates.sum() <= self.n_probe * len(self) / self.n_lists:
+            # A selective filter leaves fewer rows than the probes would scan anyway
+            return ExactIndex.search(self, query, k, candidates)
+        probes = top_k(self.centroids @ query, self.n_probe)
+        rows = np.concatenate([self.order[self.offsets[p]:self.offsets[p + 1]] for p in probes])
+        if candidates is not None:
+            rows = rows[candidates[rows]]
+        if len(rows) < k:
+            # Too few rows in the probed buckets to fill k; fall back to a full scan
+            return ExactIndex.search(self, query, k, candidates)
+        scores = self.embeddings[rows] @ query
+        selected = top_k(scores, k)
+        return rows[selected], scores[selected]
+
+
+class RescoringIndex(VectorIndex):
+    """Finds candidates with an index over quantized rows, then rescores them in float32
+
+    The full-precision matrix is only touched for rescore_factor * k rows per
+    query, so it can live in a memory-mapped file instead of in RAM.
+    """
+
+    def __init__(self, embeddings: np.ndarray, candidate_index: VectorIndex, rescore_factor: int = 4):
+        super().__init__(embeddings)
+        self.candidate_index = candidate_index
+        self.rescore_factor = max(1, rescore_factor)
+
+    def search(self, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        rows, _ = self.candidate_index.search(query, k * self.rescore_factor, candidates)
+        rows = np.sort(rows)  # read the memory-mapped rows in file order
+        scores = self.embeddings[rows] @ query
+        selected = top_k(scores, k)
+        return rows[selected], scores[selected]
+
+
+def build_index(embeddings: np.ndarray, kind: str = "exact", min_rows: int = 0,
+                storage: str = "float32", rescore_factor: int = 4, **options) -> VectorIndex:
+    """Build the configured index, using exact search for small matrices
+
+    With int8 storage the index scans a quantized copy of the
+    rows and rescores its candidates against embeddings in full precision.
+    """
+    if storage != "float32":
+        quantized = QuantizedEmbeddings(embeddings, storage)
+        candidate_index = build_index(quantized, kind, min_rows, **options)
+        return RescoringIndex(embeddings, candidate_index, rescore_factor)
+    if kind == "exact" or len(embeddings) < max(min_rows, 1):
+        return ExactIndex(embeddings)
+    if kind == "ivf":
+        return IVFIndex(embeddings, **options)
+    raise ValueError(f"Unknown vector index type: {kind}")
+
+
+def index_nbytes(index: VectorIndex) -> int:
+    """Resident bytes of the rows an index scans (memory-mapped rows count as zero)"""
+    if isinstance(index, RescoringIndex):
+        return index_nbytes(index.candidate_index)
+    if isinstance(index.embeddings, np.memmap):
+        return 0
+    return index.embeddings.nbytes
+
+
+def recall_at_k(index: VectorIndex, queries: np.ndarray, k: int) -> float:
+    """Fraction of the exact top-k neighbours the index returns, averaged over queries"""
+    exact = ExactIndex(index.embeddings)
+    found = 0
+    for query in queries:
+        expected, _ = exact.search(query, k)
+        returned, _ = index.search(query, k)
+        found += len(np.intersect1d(expected, returned))
+    return found / max(1, len(queries) * min(k, len(index)))
+
+
+
+def benchmark_storage(embeddings: np.ndarray, queries: np.ndarray, k: int = 3,
+                      storages: Sequence[str] = STORAGE_TYPES,
+                      kind: str = "exact", **options) -> Dict[str, Dict[str, float]]:
+    """Compare recall@k, scanned-matrix size and query latency across storage types
+
+    embeddings and queries must be L2-normalized float32. Recall is measured
+    against exact float32 search.
+    """
+    results = {}
+    for storage in storages:
+        started = time.perf_counter()
+        index = build_index(embeddings, kind, storage=storage, **options)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, k)
+        query_ms = (time.perf_counter() - started) * 1000 / max(1, len(queries))
+
+        results[storage] = {
+            f"recall@{k}": recall_at_k(index, queries, k),
+            "scanned_mb": index_nbytes(index) / 1e6,
+            "query_ms": query_ms,
+            "build_seconds": build_seconds,
+        }
+    return results
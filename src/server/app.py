@@ -0,0 +1,286 @@
+"""Headless HTTP API for the car sales assistant
+
+    python -m src.server.app --port 8000 --workers 16 --queue 32
+
+Endpoints (JSON in, JSON out):
+    POST   /sessions          -> {"session_id"}
+    DELETE /sessions/<id>
+    POST   /chat              {"message", "session_id"?} -> {"session_id", "reply"}
+    POST   /cars              {"query", "session_id"?}   -> {"session_id", "cars"}
+    GET    /health            -> {"ready", "sessions", "inflight", "capacity"}
+    GET    /metrics           -> Prometheus text: stage latencies, tokens, caches, load
+
+Requests run on a bounded worker pool. When every worker is busy and the
+queue is full the server answers 503 with Retry-After instead of piling up
+work, so load balancers can route elsewhere.
+"""
+import json
+import time
+import argparse
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from ..core.assistant import NO_CAR_DATA, NO_MATCHING_CARS, RETRIEVAL_ERROR, CarSalesAssistant, setup_assistant
+from ..core.session import ChatSession
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when the worker pool and its queue are full"""
+
+
+class SessionStore:
+    """Thread-safe map of session IDs to chat sessions with idle expiry and a size cap"""
+
+    def __init__(self, max_sessions: int = 10000, idle_seconds: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, Tuple[ChatSession, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def create(self) -> ChatSession:
+        session = ChatSession()
+        with self._lock:
+            now = time.monotonic()
+            self._sessions[session.session_id] = (session, now)
+            self._expire(now)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return a live session and mark it as used, or None if unknown or expired"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            item = self._sessions.get(session_id)
+            if item is None:
+                return None
+            self._sessions[session_id] = (item[0], now)
+            self._sessions.move_to_end(session_id)
+            return item[0]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+class WorkerPool:
+    """Thread pool that rejects work instead of queueing without bound
+
+    Retrieval spends its time in NumPy and the encoder and LLM calls wait on
+    the network, both of which release the GIL, so threads give real
+    concurrency here. At most workers + queue_size jobs are admitted at once.
+    """
+
+    def __init__(self, workers: int = 16, queue_size: int = 32):
+        self.capacity = workers + queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assistant-worker")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._inflight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run fn on a worker and wait for its result, raising Overloaded when full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded()
+        with self._lock:
+            self._inflight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        # The slot is freed when the job finishes, even if the caller stops waiting
+        future.add_done_callback(self._release)
+        return future.result(timeout)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._inflight -= 1
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AssistantHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+
+    def _session_for(self, body: Dict[str, Any]) -> Optional[ChatSession]:
+        """The request's session, a new one if it names none, or None if it names an unknown one"""
+        session_id = body.get("session_id")
+        if not session_id:
+            return self.server.sessions.create()
+        return self.server.sessions.get(session_id)
+
+    def _run(self, fn: Callable, *args, **kwargs) -> Tuple[bool, Any]:
+        """Run a job on the pool, answering 503/504 itself when it cannot complete"""
+        try:
+            return True, self.server.pool.run(fn, *args, timeout=self.server.request_timeout, **kwargs)
+        except Overloaded:
+            self._send_json(503, {"error": "Server is busy, try again shortly"}, {"Retry-After": "1"})
+        except FutureTimeout:
+            self._send_json(504, {"error": "Timed out waiting for the assistant"})
+        return False, None
+
+    def _send_metrics(self) -> None:
+        server = self.server
+        text = server.assistant.metrics_text() + "\n".join([
+            "# TYPE assistant_server_inflight_requests gauge",
+            f"assistant_server_inflight_requests {server.pool.inflight}",
+            "# TYPE assistant_server_capacity gauge",
+            f"assistant_server_capacity {server.pool.capacity}",
+            "# TYPE assistant_server_rejected_total counter",
+            f"assistant_server_rejected_total {server.pool.rejected}",
+            "# TYPE assistant_server_sessions gauge",
+            f"assistant_server_sessions {len(server.sessions)}",
+        ]) + "\n"
+        payload = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            self._send_metrics()
+            return
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, {
+                "ready": self.server.assistant.inventory is not None,
+                "sessions": len(self.server.sessions),
+                "inflight": self.server.pool.inflight,
+                "capacity": self.server.pool.capacity,
+            })
+            return
+        self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_DELETE(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "sessions":
+            if self.server.sessions.delete(parts[1]):
+                self._send_json(204)
+            else:
+                self._send_json(404, {"error": "Unknown session"})
+            return
+        self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {str(e)}"})
+            return
+
+        if path == "/sessions":
+            self._send_json(201, {"session_id": self.server.sessions.create().session_id})
+            return
+
+        if path not in ("/chat", "/cars"):
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        text = body.get("message" if path == "/chat" else "query")
+        if not isinstance(text, str) or not text.strip():
+            self._send_json(400, {"error": "message is required" if path == "/chat" else "query is required"})
+            return
+        session = self._session_for(body)
+        if session is None:
+            self._send_json(404, {"error": "Unknown or expired session"})
+            return
+
+        assistant: CarSalesAssistant = self.server.assistant
+        if path == "/chat":
+            ok, reply = self._run(assistant.get_completion, text, session=session)
+            if ok:
+                self._send_json(200, {"session_id": session.session_id, "reply": reply})
+            return
+
+        ok, cars = self._run(assistant.get_relevant_cars, text, session=session)
+        if ok:
+            if cars in (NO_CAR_DATA, NO_MATCHING_CARS, RETRIEVAL_ERROR):
+                self._send_json(200, {"session_id": session.session_id, "cars": [], "detail": cars})
+            else:
+                self._send_json(200, {"session_id": session.session_id, "cars": cars.split("\n")})
+
+
+def create_server(assistant: CarSalesAssistant, host: str = "127.0.0.1", port: int = 8000,
+                  workers: int = 16, queue_size: int = 32, request_timeout: float = 60.0,
+                  max_sessions: int = 10000, session_idle_seconds: float = 3600.0) -> ThreadingHTTPServer:
+    """Build the HTTP server around a loaded assistant; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), AssistantHandler)
+    server.daemon_threads = True
+    server.assistant = assistant
+    server.pool = WorkerPool(workers, queue_size)
+    server.sessions = SessionStore(max_sessions, session_idle_seconds)
+    server.request_timeout = request_timeout
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the car sales assistant over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--config", default="data/config.json", help="app config with api_key and inventory")
+    parser.add_argument("--workers", type=int, default=16, help="requests handled concurrently")
+    parser.add_argument("--queue", type=int, default=32, help="requests waiting for a worker before 503s")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds before a request gets a 504")
+    args = parser.parse_args()
+
+    assistant = setup_assistant(config_path=args.config)
+    server = create_server(assistant, args.host, args.port, args.workers, args.queue, args.timeout)
+    logger.info(f"Serving the assistant on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Local stand-in for the OpenAI chat completions endpoint
+
+    python -m src.server.mock_openai --port 8100 --latency 0.5
+
+Point the assistant at it with "openai_base_url": "http://127.0.0.1:8100/v1"
+in data/config.json. Replies echo the customer's message and name the first
+car in the prompt, after a fixed delay that simulates LLM latency.
+"""
+import json
+import time
+import uuid
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def mock_reply(messages: List[Dict[str, str]]) -> str:
+    """Deterministic reply built from the last user message and the inventory message"""
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    prompt = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    car = next((line.strip() for line in prompt.splitlines() if "VIN: " in line), "")
+    # Year, Make and Model of the first car in the prompt
+    summary = " ".join(field.split(": ", 1)[1] for field in car.split(", ")[3:6] if ": " in field)
+    return f"You asked: {user}" + (f" I recommend the {summary}." if summary else "")
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        with self.server.requests_lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        reply = mock_reply(request.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "mock")
+        created = int(time.time())
+
+        try:
+            if request.get("stream"):
+                self._stream_reply(completion_id, created, model, reply)
+                return
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(reply.split()), "total_tokens": 0},
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped waiting, e.g. a cancelled reply
+            logger.debug("Client disconnected before the reply was sent")
+
+    def _stream_reply(self, completion_id: str, created: int, model: str, reply: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, word in enumerate(reply.split(" ")):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def create_mock_server(host: str = "127.0.0.1", port: int = 8100, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Build the mock server; port 0 picks a free port (see server.server_address)"""
+    server = ThreadingHTTPServer((host, port), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = 0
+    server.requests_lock = threading.Lock()
+    return server
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Run the mock server on a background thread, for end-to-end tests"""
+    server = create_mock_server(host, port, latency)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds to wait before replying")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = create_mock_server(args.host, args.port, args.latency)
+    logger.info(f"Mock OpenAI listening on http://{args.host}:{server.server_address[1]}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,121 @@
+import time
+
 import flet as ft
 
 mks = ft.MarkdownStyleSheet(
     p_text_style=ft.TextStyle(size=18)
 )
 
+AVATARS = {"user": "hatsune-miku-dance.gif", "bot": "matador.png"}
+
+def avatar(speaker_type):
+    # A single control painting the image straight from its src, which
+    # Flutter decodes once and shares from its image cache for every message
+    return ft.CircleAvatar(
+        foreground_image_src=AVATARS[speaker_type],
+        bgcolor=ft.colors.TRANSPARENT
+    )
+
 class ChatItem(ft.Row):
-    def __init__(self, speaker_type, message):
-        super().__init__()
+    def __init__(self, speaker_type, message, key=None):
+        super().__init__(key=key)
+        self.speaker_type = speaker_type
         self.vertical_alignment = ft.CrossAxisAlignment.START
+        self.markdown = ft.Markdown(message, selectable=True, md_style_sheet=mks)
         if speaker_type == "user":
             self.controls = [
                 ft.Container(
-                    content=ft.Markdown(message, selectable=True, md_style_sheet=mks), 
+                    content=self.markdown, 
                     # bgcolor=ft.colors.SURFACE_VARIANT,
                     alignment=ft.Alignment(x=1, y=0),
                     padding=ft.Padding(top=5, bottom=5, left=10, right=10),
                     border_radius=22,
                     expand_loose=True
                 ),
-                ft.CircleAvatar(
-                    content=ft.Image(
-                        src="hatsune-miku-dance.gif"
-                    ),
-                    bgcolor=ft.colors.TRANSPARENT
-                )
+                avatar("user")
             ]
             self.alignment = ft.MainAxisAlignment.END
             
         else:
             self.controls = [
-                ft.CircleAvatar(
-                    content=ft.Image(
-                        src="matador.png"
-                    ),
-                    bgcolor=ft.colors.TRANSPARENT
-                ),
+                avatar("bot"),
                 ft.Container(
-                    content=ft.Markdown(message, selectable=True, md_style_sheet=mks), 
+                    content=self.markdown, 
 #                    bgcolor=ft.colors.SURFACE_VARIANT,
                     padding=ft.Padding(top=5, bottom=5, left=10, right=10),
                     border_radius=10,
                     # expand_loose=True
                     expand=True
                 )
-            ]
\ No newline at end of file
+            ]
+
+    def append_text(self, delta):
+        self.markdown.value = (self.markdown.value or "") + delta
+
+    def to_record(self):
+        return (self.key, self.speaker_type, self.markdown.value or "")
+
+
+class Transcript(ft.ListView):
+    """Chat list that keeps at most max_live messages as controls
+
+    Older messages are archived as plain (key, speaker, text) tuples, so a
+    kiosk that chats all day neither grows its control tree nor slows down
+    page.update(). Scrolling to the top brings archived messages back a
+    page at a time; the next new message trims the list again.
+    """
+
+    def __init__(self, max_live=40, page_size=20, **kwargs):
+        super().__init__(auto_scroll=True, on_scroll=self._on_scroll, **kwargs)
+        self.max_live = max_live
+        self.page_size = page_size
+        self.archive = []
+        self._next_key = 0
+
+    def add(self, speaker_type, message):
+        """Append a message and return its ChatItem; the caller updates the page"""
+        item = ChatItem(speaker_type, message, key=f"msg-{self._next_key}")
+        self._next_key += 1
+        self.controls.append(item)
+        # Follow the conversation again after browsing older messages
+        self.auto_scroll = True
+        excess = len(self.controls) - self.max_live
+        if excess > 0:
+            self.archive.extend(old.to_record() for old in self.controls[:excess])
+            del self.controls[:excess]
+        return item
+
+    def _on_scroll(self, e):
+        if self.archive and e.pixels <= e.min_scroll_extent:
+            self.load_earlier()
+
+    def load_earlier(self):
+        """Restore the newest page of archived messages above the live ones"""
+        batch = self.archive[-self.page_size:]
+        del self.archive[-self.page_size:]
+        anchor = self.controls[0].key if self.controls else None
+        self.controls[:0] = [ChatItem(speaker_type, text, key=key) for key, speaker_type, text in batch]
+        # Keep the message the user was reading in view instead of jumping to the end
+        self.auto_scroll = False
+        self.update()
+        if anchor is not None:
+            self.scroll_to(key=anchor, duration=0)
+
+
+class UpdateThrottle:
+    """Coalesces page.update() calls while a reply streams in"""
+
+    def __init__(self, page, interval=0.08):
+        self.page = page
+        self.interval = interval
+        self._last_update = 0.0
+
+    def request(self):
+        now = time.monotonic()
+        if now - self._last_update >= self.interval:
+            self._last_update = now
+            self.page.update()
+
+    def flush(self):
+        self._last_update = time.monotonic()
+        self.page.update()
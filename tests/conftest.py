@@ -0,0 +1,76 @@
+import os
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+# Tests import the app as it runs from the repository root (src.core...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_inventory import generate_inventory
+from src.core.assistant import CarSalesAssistant, Config
+from src.server.mock_openai import start_mock_server
+
+
+class StubEncoder:
+    """Stands in for the sentence transformer: hashes words into buckets and counts calls"""
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+        self.calls = 0
+        self.texts = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimensions
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        self.calls += 1
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(",", " ").split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimensions] += 1.0
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def make_assistant():
+    """Build assistants with a StubEncoder and no on-disk cache unless a test sets one"""
+    def make(**config) -> CarSalesAssistant:
+        config.setdefault("EMBEDDING_CACHE_PATH", None)
+        assistant = CarSalesAssistant(Config(**config), api_key="test")
+        assistant._model = StubEncoder()
+        return assistant
+
+    return make
+
+
+@pytest.fixture
+def assistant(make_assistant):
+    return make_assistant()
+
+
+@pytest.fixture
+def cars():
+    """A small synthetic inventory frame, the same on every run"""
+    return generate_inventory(60, seed=1)
+
+
+@pytest.fixture
+def cars_csv(cars, tmp_path):
+    path = tmp_path / "cars.csv"
+    cars.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def mock_openai():
+    """A local OpenAI stand-in at server.base_url; set server.latency to slow replies down"""
+    server = start_mock_server(port=0)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,43 @@
+import asyncio
+
+
+def test_completion_commits_picks_with_the_turn(make_assistant, cars_csv, mock_openai):
+    assistant = make_assistant(OPENAI_BASE_URL=mock_openai.base_url)
+    assistant.load_car_data(cars_csv)
+    session = assistant.new_session()
+
+    reply = assistant.get_completion("Do you have a red SUV?", session=session)
+
+    assert reply.startswith("You asked: Do you have a red SUV?")
+    assert len(session.conversation_history) == 2
+    assert session.last_recommendations
+    assert all("VIN: " in car for car in session.last_recommendations)
+
+
+def test_cancelled_stream_leaves_session_untouched(make_assistant, cars_csv, mock_openai):
+    assistant = make_assistant(OPENAI_BASE_URL=mock_openai.base_url)
+    assistant.load_car_data(cars_csv)
+    session = assistant.new_session()
+    mock_openai.latency = 0.5
+
+    async def cancel_reply():
+        async def consume():
+            async for _ in assistant.get_completion_stream_async("Do you have a red SUV?", session=session):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # Retrieval ran on a worker thread that outlives the cancelled task
+        await asyncio.sleep(0.2)
+
+    asyncio.run(cancel_reply())
+    assert session.conversation_history == []
+    assert session.last_recommendations == []
+
+    mock_openai.latency = 0.0
+    reply = "".join(assistant.get_completion_stream("Do you have a red SUV?", session=session))
+    assert reply.startswith("You asked:")
+    assert len(session.conversation_history) == 2
+    assert session.last_recommendations
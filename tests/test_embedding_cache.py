@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.core.embedding_cache import EmbeddingCache
+
+DOCUMENTS = ["VIN: A1, Make: Toyota", "VIN: B2, Make: Honda", "VIN: C3, Make: Ford"]
+
+
+def vectors(count, dimensions=8):
+    return np.random.default_rng(0).normal(size=(count, dimensions)).astype(np.float32)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    cache = EmbeddingCache(path, "model-a")
+    keys = [cache.key(doc) for doc in DOCUMENTS]
+    assert cache.lookup(keys) == (None, [0, 1, 2])
+
+    fresh = vectors(2)
+    cache.put(keys[:2], fresh)
+    cache.save()
+
+    reloaded = EmbeddingCache(path, "model-a")
+    assert len(reloaded) == 2
+    found, missing = reloaded.lookup(keys)
+    assert missing == [2]
+    np.testing.assert_array_equal(found[:2], fresh)
+    assert not found[2].any()
+
+
+def test_other_model_invalidates_the_cache(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    cache = EmbeddingCache(path, "model-a")
+    cache.put([cache.key(doc) for doc in DOCUMENTS], vectors(3))
+    cache.save()
+
+    other = EmbeddingCache(path, "model-b")
+    assert len(other) == 0
+    assert other.key(DOCUMENTS[0]) != cache.key(DOCUMENTS[0])
+    assert other.lookup([other.key(doc) for doc in DOCUMENTS]) == (None, [0, 1, 2])
+
+
+def test_save_prunes_to_retained_keys(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    cache = EmbeddingCache(path, "model-a")
+    keys = [cache.key(doc) for doc in DOCUMENTS]
+    fresh = vectors(3)
+    cache.put(keys, fresh)
+    cache.save(retain=[keys[2], keys[0]])
+
+    reloaded = EmbeddingCache(path, "model-a")
+    assert len(reloaded) == 2
+    found, missing = reloaded.lookup(keys)
+    assert missing == [1]
+    np.testing.assert_array_equal(found[[0, 2]], fresh[[0, 2]])
+
+
+def test_warm_reload_skips_the_encoder(make_assistant, cars_csv, tmp_path):
+    path = str(tmp_path / "embeddings.npz")
+    cold = make_assistant(EMBEDDING_CACHE_PATH=path)
+    cold.load_car_data(cars_csv)
+    assert cold.model.texts == len(cold.inventory)
+
+    warm = make_assistant(EMBEDDING_CACHE_PATH=path)
+    warm.load_car_data(cars_csv)
+    assert warm.model.calls == 0
+    np.testing.assert_allclose(warm.inventory.embeddings, cold.inventory.embeddings, rtol=1e-6)
@@ -0,0 +1,66 @@
+import pytest
+
+from src.core.filters import QueryConstraints, extract_constraints
+
+AWD = ["awd", "all wheel", "all-wheel"]
+FOUR_WD = ["4wd", "4x4", "four wheel", "four-wheel"]
+
+CASES = [
+    # Stated limits
+    ("Do you have a red SUV under $30k?", QueryConstraints(max_price=30000)),
+    ("something between $20k and $30k", QueryConstraints(min_price=20000, max_price=30000)),
+    ("budget of 25,000 dollars", QueryConstraints(max_price=25000)),
+    ("over $40k is fine", QueryConstraints(min_price=40000)),
+    ("Any AWD trucks from 2020 or newer?", QueryConstraints(min_year=2020, drivetrains=[AWD])),
+    ("older than 2015", QueryConstraints(max_year=2014)),
+    ("under 50k miles", QueryConstraints(max_miles=50000)),
+    ("Looking for an electric car with low mileage", QueryConstraints(max_miles=50000, fuel_types=["electric"])),
+    ("a hybrid", QueryConstraints(fuel_types=["hybrid"])),
+    ("Diesel pickup for towing", QueryConstraints(fuel_types=["diesel"])),
+    ("4x4 that can go off road", QueryConstraints(drivetrains=[FOUR_WD])),
+    ("Something with 7 seats for road trips", QueryConstraints(min_passengers=7)),
+    ("I need a family car with a third row under $40k", QueryConstraints(max_price=40000, min_passengers=7)),
+    ("a gas-powered truck", QueryConstraints(fuel_types=["gasoline"])),
+    ("is there a gasoline engine version", QueryConstraints(fuel_types=["gasoline"])),
+    ("I want an EV, not a hybrid", QueryConstraints(fuel_types=["electric"])),
+    # Negations drop the mention instead of requiring it
+    ("I don't want an EV", QueryConstraints()),
+    ("anything but a hybrid", QueryConstraints()),
+    ("no diesel please", QueryConstraints()),
+    ("not AWD", QueryConstraints()),
+    ("no rush, electric please", QueryConstraints(fuel_types=["electric"])),
+    # "Gas" as fuel economy, not fuel type
+    ("Is the Prius better on gas than the Camry?", QueryConstraints()),
+    ("save money on gas", QueryConstraints()),
+    ("something good on gas", QueryConstraints()),
+    ("Show me a cheap sedan with good gas mileage", QueryConstraints()),
+    # Distances are not odometer limits
+    ("within 10 miles of downtown", QueryConstraints()),
+    ("a dealer less than 5 miles away", QueryConstraints()),
+]
+
+
+@pytest.mark.parametrize("query, expected", CASES, ids=[query for query, _ in CASES])
+def test_extract_constraints(query, expected):
+    assert extract_constraints(query) == expected
+
+
+REFERENCE_CASES = [
+    ("tell me more about the second one", (True, 1)),
+    ("is the 3rd one AWD?", (True, 2)),
+    ("what about 1", (True, 0)),
+    # Prices, years, rows and seat counts are not references
+    ("anything under $2,000?", (False, -1)),
+    ("a 2020 Camry", (False, -1)),
+    ("an SUV with a third row", (False, -1)),
+    ("SUV for 2 people", (False, -1)),
+    ("a sedan with 3 seats", (False, -1)),
+    ("a 2-seater convertible", (False, -1)),
+    ("room for 3 passengers", (False, -1)),
+    ("a car that seats 2", (False, -1)),
+]
+
+
+@pytest.mark.parametrize("query, expected", REFERENCE_CASES, ids=[query for query, _ in REFERENCE_CASES])
+def test_is_reference_query(assistant, query, expected):
+    assert assistant.is_reference_query(query) == expected
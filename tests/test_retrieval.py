@@ -0,0 +1,28 @@
+import pytest
+
+from src.core.assistant import NO_MATCHING_CARS
+
+QUERIES = [
+    "family SUV with good mileage",
+    "a hybrid",
+    "red sedan under $30k",
+    "AWD truck from 2020 or newer",
+    "a car from 1990 or older",  # the mask excludes every car
+    "family SUV with good mileage",  # duplicates share one encoding
+]
+
+
+@pytest.mark.parametrize("score_elements", [16_000_000, 100])
+def test_batch_matches_single_queries(make_assistant, cars_csv, score_elements):
+    # 100 scores hold one query per chunk against 60 cars
+    assistant = make_assistant(BATCH_SCORE_ELEMENTS=score_elements)
+    assistant.load_car_data(cars_csv)
+    assert assistant._constraint_mask(QUERIES[0], assistant.inventory) is None
+    assert assistant._constraint_mask(QUERIES[1], assistant.inventory) is not None
+
+    batch = assistant.get_relevant_cars_batch(QUERIES)
+
+    single = [assistant.get_relevant_cars(query, session=assistant.new_session()) for query in QUERIES]
+    assert batch == single
+    assert batch[4] == NO_MATCHING_CARS
+    assert all(result and result != NO_MATCHING_CARS for i, result in enumerate(batch) if i != 4)
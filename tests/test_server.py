@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.server.app import create_server
+
+
+@pytest.fixture
+def serve(make_assistant, cars_csv, mock_openai):
+    """Start the HTTP API around a loaded assistant that talks to the mock LLM"""
+    servers = []
+
+    def start(**options):
+        assistant = make_assistant(OPENAI_BASE_URL=mock_openai.base_url)
+        assistant.load_car_data(cars_csv)
+        server = create_server(assistant, port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.pool.shutdown()
+        server.server_close()
+
+
+def post(url, body):
+    """POST body (a dict, or raw bytes) and return the status, JSON reply and headers"""
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read()), response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read()), e.headers
+
+
+def test_chat_keeps_the_conversation(serve, mock_openai):
+    base, server = serve()
+    status, reply, _ = post(base + "/chat", {"message": "Do you have a red SUV?"})
+    assert status == 200
+    assert reply["reply"].startswith("You asked: Do you have a red SUV?")
+
+    status, follow_up, _ = post(base + "/chat", {"message": "the first one", "session_id": reply["session_id"]})
+    assert status == 200
+    assert follow_up["session_id"] == reply["session_id"]
+    assert len(server.sessions.get(reply["session_id"]).conversation_history) == 4
+    assert mock_openai.requests == 2
+
+
+def test_cars(serve):
+    base, _ = serve()
+    status, reply, _ = post(base + "/cars", {"query": "a hybrid"})
+    assert status == 200
+    assert reply["cars"] and all("Fuel Type: Hybrid" in car for car in reply["cars"])
+
+    status, reply, _ = post(base + "/cars", {"query": "a car from 1990 or older"})
+    assert status == 200
+    assert reply["cars"] == [] and reply["detail"]
+
+
+def test_unknown_session(serve):
+    base, _ = serve()
+    status, reply, _ = post(base + "/chat", {"message": "hello", "session_id": "no-such-session"})
+    assert status == 404
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", {"message": ""}, {"query": "hybrid"}])
+def test_bad_body(serve, body):
+    base, _ = serve()
+    status, reply, _ = post(base + "/chat", body)
+    assert status == 400
+    assert reply["error"]
+
+
+def test_overloaded_server_answers_503(serve, mock_openai):
+    base, server = serve(workers=1, queue_size=0)
+    mock_openai.latency = 1.0
+    busy = threading.Thread(target=post, args=(base + "/chat", {"message": "Do you have a red SUV?"}))
+    busy.start()
+    deadline = time.monotonic() + 5
+    while server.pool.inflight == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status, reply, headers = post(base + "/cars", {"query": "a hybrid"})
+    busy.join()
+
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+    assert server.pool.rejected == 1
@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+import speech_recognition as sr
+
+from src.core.stt import MicrophoneListener, ScriptedBackend, benchmark_backends
+
+SAMPLE_RATE = 16000
+TRANSCRIPTS = ["Do you have a red SUV", "Any AWD trucks from 2020 or newer"]
+
+
+def noise(seed, seconds=0.4):
+    # Unlike a pure tone, no two chunks of noise are equal
+    samples = np.random.default_rng(seed).normal(0, 3000, int(SAMPLE_RATE * seconds))
+    return samples.astype(np.int16).tobytes()
+
+
+CLIPS = [(noise(i), text) for i, text in enumerate(TRANSCRIPTS)]
+
+
+def audio(frame_data):
+    return sr.AudioData(frame_data, SAMPLE_RATE, 2)
+
+
+class FakeMicrophone:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeRecognizer:
+    """Plays queued phrases, each a list of audio chunks, like sr.Recognizer.listen"""
+
+    energy_threshold = 300
+
+    def __init__(self):
+        self.phrases = queue.Queue()
+
+    def say(self, frame_data, chunks=4):
+        size = len(frame_data) // chunks // 2 * 2
+        self.phrases.put([audio(frame_data[i:i + size]) for i in range(0, len(frame_data), size)])
+
+    def adjust_for_ambient_noise(self, source, duration=1):
+        pass
+
+    def _next_phrase(self, timeout):
+        try:
+            return self.phrases.get(timeout=timeout)
+        except queue.Empty:
+            raise sr.WaitTimeoutError("listening timed out")
+
+    def _stream(self, timeout):
+        chunks = self._next_phrase(timeout)
+        yield from chunks
+        yield chunks[-1]  # the real recognizer repeats the last buffer
+
+    def listen(self, source, timeout=None, phrase_time_limit=None, stream=False):
+        if stream:
+            return self._stream(timeout)
+        return audio(b"".join(chunk.frame_data for chunk in self._next_phrase(timeout)))
+
+
+class OfflineBackend(ScriptedBackend):
+    name = "offline"
+    supports_partials = False
+
+    def recognize(self, audio_data):
+        raise sr.RequestError("recognition connection failed")
+
+
+@pytest.fixture
+def recognizer():
+    return FakeRecognizer()
+
+
+@pytest.fixture
+def make_listener(recognizer):
+    listeners = []
+
+    def make(backend=None):
+        listener = MicrophoneListener(backend or ScriptedBackend(CLIPS), recognizer=recognizer,
+                                      microphone=FakeMicrophone(), calibration_duration=0.0, poll_interval=0.05)
+        listeners.append(listener)
+        return listener
+
+    yield make
+    for listener in listeners:
+        listener.close(1.0)
+
+
+def test_listen_returns_transcript_and_partials(make_listener, recognizer):
+    listener = make_listener()
+    partials = []
+    recognizer.say(CLIPS[0][0])
+    assert listener.listen(timeout=2.0, on_partial=partials.append) == TRANSCRIPTS[0]
+    assert partials[-1] == TRANSCRIPTS[0]
+    assert all(TRANSCRIPTS[0].startswith(partial) for partial in partials)
+    assert len(partials) > 1
+
+
+def test_listen_skips_unintelligible_audio(make_listener, recognizer):
+    listener = make_listener()
+    recognizer.say(noise(99))
+    recognizer.say(CLIPS[1][0])
+    assert listener.listen(timeout=2.0) == TRANSCRIPTS[1]
+
+
+def test_listen_times_out(make_listener):
+    listener = make_listener()
+    started = time.monotonic()
+    assert listener.listen(timeout=0.3) is None
+    assert time.monotonic() - started < 1.0
+
+
+def test_listen_cancel(make_listener):
+    listener = make_listener()
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.monotonic()
+    assert listener.listen(timeout=5.0, cancel=cancel) is None
+    assert time.monotonic() - started < 1.0
+
+
+def test_listen_raises_when_backend_is_unavailable(make_listener, recognizer):
+    listener = make_listener(OfflineBackend(CLIPS))
+    recognizer.say(CLIPS[0][0])
+    with pytest.raises(sr.RequestError):
+        listener.listen(timeout=2.0)
+
+
+def test_benchmark_backends(tmp_path):
+    for i, (frame_data, text) in enumerate(CLIPS):
+        with wave.open(str(tmp_path / f"clip{i}.wav"), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(frame_data)
+        (tmp_path / f"clip{i}.txt").write_text(text + ".", encoding="utf-8")
+
+    results = benchmark_backends([ScriptedBackend.from_directory(str(tmp_path)), OfflineBackend([])], str(tmp_path))
+    assert results["scripted"]["count"] == len(CLIPS)
+    assert results["scripted"]["exact_match"] == 1.0
+    assert results["offline"]["count"] == len(CLIPS)
+    assert results["offline"]["exact_match"] == 0.0
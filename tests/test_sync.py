@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def loaded(assistant, cars_csv):
+    assistant.load_car_data(cars_csv)
+    return assistant
+
+
+def test_sync_diffs_by_vin(loaded, cars, tmp_path):
+    before = loaded.inventory
+    changed = cars.drop(index=[1, 2]).copy()
+    changed.loc[0, "SellingPrice"] += 1000
+    new_car = cars.iloc[[3]].assign(VIN="NEWVIN0000000001")
+    changed = pd.concat([changed, new_car], ignore_index=True)
+    path = tmp_path / "synced.csv"
+    changed.to_csv(path, index=False)
+    encoded = loaded.model.texts
+
+    stats = loaded.sync_car_data(str(path))
+
+    assert stats == {"added": 1, "modified": 1, "removed": 2, "unchanged": len(cars) - 3}
+    assert loaded.model.texts - encoded == 2  # only the added and the modified car
+    after = loaded.inventory
+    assert len(after) == len(cars) - 1
+    old_rows, new_rows = before.rows_by_vin, after.rows_by_vin
+    assert cars.loc[1, "VIN"] not in new_rows and cars.loc[2, "VIN"] not in new_rows
+    for vin in cars.loc[4:, "VIN"]:
+        # Reused rows only pass through normalization again
+        assert np.allclose(after.embeddings[new_rows[vin]], before.embeddings[old_rows[vin]], rtol=1e-6, atol=0)
+    assert f"Selling Price: ${cars.loc[0, 'SellingPrice'] + 1000}" in after.documents[new_rows[cars.loc[0, "VIN"]]]
+
+
+def test_sync_without_changes_keeps_the_inventory(loaded, cars_csv):
+    before = loaded.inventory
+    encoded = loaded.model.calls
+
+    stats = loaded.sync_car_data(cars_csv)
+
+    assert stats == {"added": 0, "modified": 0, "removed": 0, "unchanged": len(before)}
+    assert loaded.inventory is before
+    assert loaded.model.calls == encoded
+
+
+def test_references_follow_the_synced_inventory(loaded, cars, tmp_path):
+    documents = loaded.inventory.documents
+    session = loaded.new_session()
+    session.last_recommendations = [documents[0], documents[1], documents[5]]
+    changed = cars.drop(index=[1]).copy()
+    changed.loc[0, "SellingPrice"] += 1000
+    path = tmp_path / "synced.csv"
+    changed.to_csv(path, index=False)
+    loaded.sync_car_data(str(path))
+    inventory = loaded.inventory
+
+    # Repriced: the current text is returned and replaces the stale pick
+    repriced = documents[0].replace(f"${cars.loc[0, 'SellingPrice']},", f"${cars.loc[0, 'SellingPrice'] + 1000},")
+    cars_text, picks = loaded._search("the first one", 0.2, inventory, session.last_recommendations)
+    assert cars_text == repriced
+    assert picks == [repriced, documents[1], documents[5]]
+
+    # Sold: searched again instead of describing a car no longer in stock
+    cars_text, picks = loaded._search("the second one", 0.2, inventory, session.last_recommendations)
+    assert documents[1] not in cars_text
+    assert picks is not None and documents[1] not in picks
+
+    # Unchanged: used as is
+    assert loaded._search("the third one", 0.2, inventory, session.last_recommendations) == (documents[5], None)